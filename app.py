@@ -102,16 +102,33 @@
 
 import os
 import re
-import math
+import sys
+import secrets
 import json
+import atexit
+import gzip
 import hashlib
 import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
 from io import BytesIO
 from datetime import datetime
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Iterator, Optional, Set, Sequence
 
 import streamlit as st
 
+from prompts import SB_BRIEF_HEADINGS, format_story_bible, make_engine_style_directive
+from voice_vectors import SampleLane, _lane_columns, _query_vec, _tokenize, _top_k_lanes, now_ts
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore[assignment]
+
 # ============================================================
 # OLIVETTI DESK — one file, production-stable, paste+click
 # ============================================================
@@ -170,38 +187,119 @@ BAYS = ["NEW", "ROUGH", "EDIT", "FINAL"]
 
 
 ENGINE_STYLES = ["NARRATIVE", "DESCRIPTIVE", "EMOTIONAL", "LYRICAL"]
+STORY_BIBLE_KEYS = ("synopsis", "genre_style_notes", "world", "characters", "outline")
 AUTOSAVE_DIR = "autosave"
-AUTOSAVE_PATH = os.path.join(AUTOSAVE_DIR, "olivetti_state.json")
+AUTOSAVE_PATH = os.path.join(AUTOSAVE_DIR, "olivetti_state.json.gz")
+LEGACY_AUTOSAVE_PATH = os.path.join(AUTOSAVE_DIR, "olivetti_state.json")  # pre-gzip saves, read-only
 MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 10MB guardrail
 
-WORD_RE = re.compile(r"[A-Za-z']+")
+_EOL_RE = re.compile(r"\r\n?")
+_EXTRA_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_MULTI_SPACE_RE = re.compile(r"[ \t]{2,}")
+_PARA_BREAK_RE = re.compile(r"\n\s*\n")
 
 
 # ============================================================
 # UTILS
 # ============================================================
-def now_ts() -> str:
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-
 def _normalize_text(s: str) -> str:
-    t = (s or "").strip()
-    t = t.replace("\r\n", "\n").replace("\r", "\n")
-    t = re.sub(r"\n{3,}", "\n\n", t)
-    t = re.sub(r"[ \t]{2,}", " ", t)
+    if not s:
+        return ""
+    # one EOL pass, and only when there is a CR at all (the common case has none)
+    t = _EOL_RE.sub("\n", s) if "\r" in s else s
+    t = _EXTRA_BLANK_LINES_RE.sub("\n\n", t)
+    t = _MULTI_SPACE_RE.sub(" ", t)
     return t.strip()
 
 
 def _split_paragraphs(text: str) -> List[str]:
-    t = _normalize_text(text)
+    return _split_normalized_paragraphs(_normalize_text(text))
+
+
+def _split_normalized_paragraphs(t: str) -> List[str]:
+    """_split_paragraphs for text that has already been through _normalize_text."""
     if not t:
         return []
-    return [p.strip() for p in re.split(r"\n\s*\n", t, flags=re.MULTILINE) if p.strip()]
+    out: List[str] = []
+    for p in _PARA_BREAK_RE.split(t):
+        p = p.strip()  # once per paragraph, not once for the filter and again for the value
+        if p:
+            out.append(p)
+    return out
+
+
+def _last_match(pat: "re.Pattern[str]", t: str) -> "Optional[re.Match[str]]":
+    """
+    The last non-overlapping match of `pat` in `t`, found by scanning
+    windows that start at the end and double in size, so the work is
+    proportional to the distance from the end rather than to len(t).
+    """
+    start, size = len(t), 256
+    while True:
+        start = max(0, start - size)
+        last = None
+        for last in pat.finditer(t, start):
+            pass
+        if last is not None or start == 0:
+            return last
+        size *= 2
+
+
+# a paragraph break in raw (un-normalized) text: two line endings with only
+# spaces/tabs between them, as _PARA_BREAK_RE sees them after _normalize_text
+_RAW_PARA_BREAK_RE = re.compile(r"(?:\r\n|\r(?!\n)|\n)[^\S\r\n]*(?:\r\n|\r(?!\n)|\n)")
+
+
+def _last_paragraph(text: str) -> str:
+    """_split_paragraphs(text)[-1] (or "") without normalizing and splitting the whole text."""
+    t = (text or "").rstrip()
+    m = _last_match(_RAW_PARA_BREAK_RE, t)
+    return _normalize_text(t[m.end():] if m else t)
+
+
+# a sentence plus its closing quotes/brackets and trailing whitespace; a final
+# unterminated fragment is its own sentence
+_SENTENCE_RE = re.compile(r"[^.!?]*[.!?]+[\"'”’)\]]*\s*|[^.!?]+$")
+
+
+def _sentence_chunks(t: str, min_chars: int = 240, max_chars: int = 1200) -> Iterator[str]:
+    """
+    Chunks of whole sentences from normalized text in one pass: sentences are
+    accumulated until the chunk reaches `min_chars`, and a chunk is flushed
+    early rather than grow past `max_chars` (a single longer sentence is
+    yielded alone). A short tail is folded into the last chunk if it fits.
+    """
+    buf: List[str] = []
+    size = 0
+    pending = ""
+    for m in _SENTENCE_RE.finditer(t):
+        sent = m.group()
+        if buf and size + len(sent) > max_chars:
+            if pending:
+                yield pending
+            pending, buf, size = "".join(buf).strip(), [], 0
+        buf.append(sent)
+        size += len(sent)
+        if size >= min_chars:
+            if pending:
+                yield pending
+            pending, buf, size = "".join(buf).strip(), [], 0
+    tail = "".join(buf).strip()
+    if tail and pending and len(pending) + 1 + len(tail) <= max_chars:
+        pending, tail = pending + " " + tail, ""
+    if pending:
+        yield pending
+    if tail:
+        yield tail
+
+
+_FILENAME_BAD_RE = re.compile(r"[^\w\- ]+")
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
 
 
 def _safe_filename(s: str, fallback: str = "olivetti") -> str:
-    s = re.sub(r"[^\w\- ]+", "", (s or "").strip()).strip()
-    s = re.sub(r"\s+", "_", s)
+    s = _FILENAME_BAD_RE.sub("", (s or "").strip()).strip()
+    s = _WHITESPACE_RUN_RE.sub("_", s)
     return s[:80] if s else fallback
 
 
@@ -213,33 +311,153 @@ def _clamp_text(s: str, max_chars: int = 12000) -> str:
 
 
 # ============================================================
-# VECTOR / VOICE VAULT (lightweight, no external deps)
+# AUTOSAVE WRITER (one background thread shared by every session)
 # ============================================================
-def _tokenize(text: str) -> List[str]:
-    return [w.lower() for w in WORD_RE.findall(text or "")]
+AUTOSAVE_DEBOUNCE_S = 0.6  # quiet period before a burst of edits is written
+AUTOSAVE_MAX_DELAY_S = 3.0  # ...but never hold a dirty snapshot longer than this
 
 
-def _hash_vec(text: str, dims: int = 512) -> List[float]:
-    vec = [0.0] * dims
-    toks = _tokenize(text)
-    for t in toks:
-        h = int(hashlib.md5(t.encode("utf-8")).hexdigest(), 16)
-        vec[h % dims] += 1.0
-    for i, v in enumerate(vec):
-        if v > 0:
-            vec[i] = 1.0 + math.log(v)
-    return vec
+class _AutosaveWriter:
+    """
+    Single background writer shared by all reruns/sessions. Submissions
+    coalesce: only the newest snapshot is kept, and it is written once
+    submissions have been quiet for AUTOSAVE_DEBOUNCE_S (capped at
+    AUTOSAVE_MAX_DELAY_S after the first unsaved one). immediate=True
+    skips the wait.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._wake = threading.Event()
+        self._pending: Optional[Sequence[Any]] = None
+        self._first_ts = 0.0
+        self._due = 0.0
+        self._busy = False
+        self._error: Optional[str] = None
+        self._writes = 0
+        atexit.register(self.drain)
+
+    def submit(self, data: Sequence[Any], immediate: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._pending is None:
+                self._first_ts = now
+            self._pending = data
+            self._due = now if immediate else min(now + AUTOSAVE_DEBOUNCE_S, self._first_ts + AUTOSAVE_MAX_DELAY_S)
+            self._wake.set()
+            if self._busy:
+                return
+            self._busy = True
+            self._idle.clear()
+        threading.Thread(target=self._run, name="olivetti-autosave", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._busy = False
+                    self._idle.set()
+                    return
+                delay = self._due - time.monotonic()
+                if delay > 0:
+                    data = None
+                    self._wake.clear()
+                else:
+                    data, self._pending = self._pending, None
+            if data is None:
+                self._wake.wait(delay)
+                continue
+            try:
+                _write_autosave_chunks(data, backup=self._writes % AUTOSAVE_BACKUP_EVERY == 0)
+                self._writes += 1
+            except Exception as e:
+                logger.error(f"Autosave write failed: {e}")
+                with self._lock:
+                    self._error = str(e)
+
+    def pop_error(self) -> Optional[str]:
+        with self._lock:
+            err, self._error = self._error, None
+        return err
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """Write any pending snapshot now and block until done (used at interpreter exit)."""
+        with self._lock:
+            self._due = 0.0
+            self._wake.set()
+        return self._idle.wait(timeout)
 
 
-def _cosine(a: List[float], b: List[float]) -> float:
-    dot = sum(x * y for x, y in zip(a, b))
-    na = math.sqrt(sum(x * x for x in a))
-    nb = math.sqrt(sum(y * y for y in b))
-    if na == 0 or nb == 0:
-        return 0.0
-    return dot / (na * nb)
+@st.cache_resource
+def _autosave_writer() -> _AutosaveWriter:
+    return _AutosaveWriter()
 
 
+# ============================================================
+# AUTOSAVE PREFETCH (read + parse overlaps the rest of the first run)
+# ============================================================
+_AUTOSAVE_CANDIDATES = (
+    (AUTOSAVE_PATH, "primary"),
+    (AUTOSAVE_PATH + ".bak", "backup"),
+    (LEGACY_AUTOSAVE_PATH, "primary"),
+    (LEGACY_AUTOSAVE_PATH + ".bak", "backup"),
+)
+
+
+def _parse_json_bytes(raw: bytes) -> Any:
+    """json.loads, via orjson when it is installed (stdlib for anything orjson rejects, e.g. NaN)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except ValueError:
+            pass
+    return json.loads(raw)
+
+
+def _read_autosave_file(path: str) -> Any:
+    """Load an autosave, gzipped (current) or plain JSON (legacy)."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+    return _parse_json_bytes(raw)
+
+
+def _read_first_autosave(writer: _AutosaveWriter) -> Tuple[Any, str, Optional[Exception]]:
+    """
+    (payload, "primary"/"backup", last error) from the first candidate that
+    parses. payload is None with no error when there is no autosave at all.
+    A save still debouncing on `writer` (another tab, or the session this
+    browser refresh replaces) is flushed first, so the read is never older
+    than an edit that was already made.
+    """
+    writer.drain()
+    last_err: Optional[Exception] = None
+    for path, label in _AUTOSAVE_CANDIDATES:
+        if not os.path.exists(path):
+            continue
+        try:
+            return _read_autosave_file(path), label, None
+        except Exception as e:
+            last_err = e
+    return None, "primary", last_err
+
+
+@st.cache_resource
+def _autosave_loader() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="olivetti-load")
+
+
+# A new session starts reading the autosave now; load_all_from_disk() joins it.
+if "did_load_autosave" not in st.session_state and "_autosave_prefetch" not in st.session_state:
+    st.session_state._autosave_prefetch = _autosave_loader().submit(_read_first_autosave, _autosave_writer())
+
+
+# ============================================================
+# VOICE VAULT (hashed int8 vectors and SampleLane: voice_vectors.py)
+# ============================================================
 def default_voice_vault() -> Dict[str, Any]:
     ts = now_ts()
     return {
@@ -248,23 +466,26 @@ def default_voice_vault() -> Dict[str, Any]:
     }
 
 
-def rebuild_vectors_in_voice_vault(compact_voices: Dict[str, Any]) -> Dict[str, Any]:
+def empty_voice_vault() -> Dict[str, Any]:
+    """In-session form of default_voice_vault(), built directly (no rebuild of empty lanes)."""
+    ts = now_ts()
+    return {name: {"created_ts": ts, "lanes": {ln: SampleLane() for ln in LANES}} for name in ("Voice A", "Voice B")}
+
+
+def _lanes_of(container: Any, key: str) -> Dict[str, Any]:
+    entry = container.get(key) if isinstance(container, dict) else None
+    lanes = entry.get("lanes") if isinstance(entry, dict) else None
+    return lanes if isinstance(lanes, dict) else {}
+
+
+def rebuild_vectors_in_voice_vault(compact_voices: Dict[str, Any], current: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """`current` is the in-session vault being replaced; its lanes are reused where the samples match."""
     out: Dict[str, Any] = {}
     for vname, v in (compact_voices or {}).items():
         created_ts = v.get("created_ts") or now_ts()
         lanes_in = v.get("lanes", {}) or {}
-        lanes_out: Dict[str, Any] = {ln: [] for ln in LANES}
-        for ln in LANES:
-            samples = lanes_in.get(ln, []) or []
-            for s in samples:
-                txt = _normalize_text(s.get("text", ""))
-                if not txt:
-                    continue
-                lanes_out[ln].append({
-                    "ts": s.get("ts") or now_ts(),
-                    "text": txt,
-                    "vec": _hash_vec(txt),
-                })
+        prev = _lanes_of(current, vname)
+        lanes_out = {ln: SampleLane.from_compact(lanes_in.get(ln), _normalize_text, prev.get(ln)) for ln in LANES}
         out[vname] = {"created_ts": created_ts, "lanes": lanes_out}
     return out
 
@@ -274,20 +495,33 @@ def compact_voice_vault(voices: Dict[str, Any]) -> Dict[str, Any]:
     for vname, v in (voices or {}).items():
         lanes_out: Dict[str, Any] = {}
         for ln in LANES:
-            samples = (v.get("lanes", {}) or {}).get(ln, []) or []
-            lanes_out[ln] = [
-                {"ts": s.get("ts"), "text": s.get("text", "")}
-                for s in samples
-                if (s.get("text") or "").strip()
-            ]
+            src = (v.get("lanes", {}) or {}).get(ln)
+            if isinstance(src, SampleLane):
+                lanes_out[ln] = src.to_compact()  # texts were normalized on the way in
+                continue
+            ts, texts = _lane_columns(src)
+            lanes_out[ln] = {"ts": ts, "texts": texts}
         out[vname] = {"created_ts": v.get("created_ts"), "lanes": lanes_out}
     return out
 
 
+def _mark_voices_changed() -> None:
+    """Flag the in-session vault for compaction on save and invalidate derived caches."""
+    st.session_state._dirty_voices = True
+    st.session_state._state_dirty = True
+    st.session_state._voice_epoch = int(st.session_state.get("_voice_epoch", 0)) + 1
+
+
 def voice_names_for_selector() -> List[str]:
+    epoch = st.session_state.get("_voice_epoch", 0)
+    cached = st.session_state.get("_voice_selector_cache")
+    if cached and cached[0] == epoch:
+        return list(cached[1])
     base = ["— None —", "Voice A", "Voice B"]
     customs = sorted([k for k in (st.session_state.voices or {}).keys() if k not in ("Voice A", "Voice B")])
-    return base + customs
+    names = base + customs
+    st.session_state._voice_selector_cache = (epoch, names)
+    return list(names)
 
 
 def create_custom_voice(name: str) -> bool:
@@ -296,7 +530,8 @@ def create_custom_voice(name: str) -> bool:
         return False
     if n in (st.session_state.voices or {}):
         return False
-    st.session_state.voices[n] = {"created_ts": now_ts(), "lanes": {ln: [] for ln in LANES}}
+    st.session_state.voices[n] = {"created_ts": now_ts(), "lanes": {ln: SampleLane() for ln in LANES}}
+    _mark_voices_changed()
     return True
 
 
@@ -313,13 +548,12 @@ def add_voice_sample(voice_name: str, lane: str, text: str) -> bool:
         # auto-create
         create_custom_voice(vn)
         v = st.session_state.voices.get(vn)
-    v.setdefault("lanes", {ln: [] for ln in LANES})
-    v["lanes"].setdefault(lane, [])
-    v["lanes"][lane].append({"ts": now_ts(), "text": t, "vec": _hash_vec(t)})
+    v.setdefault("lanes", {ln: SampleLane() for ln in LANES})
+    pool = v["lanes"].setdefault(lane, SampleLane())
     # cap per lane (keeps app fast)
-    if len(v["lanes"][lane]) > 60:
-        v["lanes"][lane] = v["lanes"][lane][-60:]
+    pool.extend([t], cap=60)
     st.session_state.voices[vn] = v
+    _mark_voices_changed()
     return True
 
 
@@ -329,18 +563,21 @@ def delete_voice_sample(voice_name: str, lane: str, index_from_end: int = 0) ->
     if not v:
         return False
     lane = lane if lane in LANES else "Narration"
-    arr = (v.get("lanes", {}) or {}).get(lane, []) or []
+    arr = (v.get("lanes", {}) or {}).get(lane)
     if not arr:
         return False
     idx = len(arr) - 1 - int(index_from_end)
     if idx < 0 or idx >= len(arr):
         return False
     arr.pop(idx)
-    v["lanes"][lane] = arr
     st.session_state.voices[vn] = v
+    _mark_voices_changed()
     return True
 
 
+_SENTENCE_PUNCT_RE = re.compile(r"[.!?]+")
+
+
 def analyze_style_samples(text: str) -> List[Dict[str, Any]]:
     """
     Analyze text for strongest writing samples based on:
@@ -354,8 +591,7 @@ def analyze_style_samples(text: str) -> List[Dict[str, Any]]:
         return []
     
     # Split into sentences
-    import re
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    sentences = [s.strip() for s in _SENTENCE_PUNCT_RE.split(text) if s.strip()]
     if not sentences:
         return []
     
@@ -413,13 +649,14 @@ def analyze_style_samples(text: str) -> List[Dict[str, Any]]:
     return scored_samples[:10]  # Top 10 samples
 
 
+_CAPITALIZED_NAME_RE = re.compile(r"\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?\b")
+
+
 def extract_entities(text: str) -> Dict[str, List[str]]:
     """
     Extract named entities from text for canon checking.
     Returns dict with entity types: characters, locations, dates, objects.
     """
-    import re
-    
     entities = {
         "characters": [],
         "locations": [],
@@ -431,7 +668,7 @@ def extract_entities(text: str) -> Dict[str, List[str]]:
         return entities
     
     # Find capitalized words (potential character names)
-    capitalized = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?\b', text)
+    capitalized = _CAPITALIZED_NAME_RE.findall(text)
     entities["characters"] = list(set(capitalized))[:20]  # Limit to top 20
     
     # Find day/month/time references
@@ -445,6 +682,15 @@ def extract_entities(text: str) -> Dict[str, List[str]]:
     return entities
 
 
+_EYE_COLORS = ('blue eyes', 'green eyes', 'brown eyes', 'gray eyes', 'grey eyes', 'hazel eyes', 'amber eyes')
+_EYE_COLOR_NAME_RE = {c: re.compile(r'([A-Z][a-z]+).*?' + c.replace(' ', r'\s+'), re.IGNORECASE) for c in _EYE_COLORS}
+_DEATH_MARKERS = ('died', 'dead', 'killed', 'perished', 'deceased')
+_DEATH_NAME_RE = {m: re.compile(r'([A-Z][a-z]+).*?' + m, re.IGNORECASE) for m in _DEATH_MARKERS}
+# names above are captured as bare letter runs, so the Characters entry is
+# split the same way ("Anna's eyes" must still yield "anna")
+_LETTER_RUN_RE = re.compile(r"[a-z]+")
+
+
 def analyze_canon_conformity(draft_text: str) -> List[Dict[str, Any]]:
     """
     Analyze draft against Story Bible for continuity violations.
@@ -465,6 +711,9 @@ def analyze_canon_conformity(draft_text: str) -> List[Dict[str, Any]]:
     if not any([synopsis, characters_bible, world_bible, outline_bible]):
         return []
     
+    # whole-word lookup for names (a substring test would match "Ann" inside "Annabelle")
+    characters_words = set(_LETTER_RUN_RE.findall(characters_bible))
+
     # Split draft into paragraphs for analysis
     paragraphs = [p.strip() for p in draft_text.split('\n\n') if p.strip()]
     
@@ -476,18 +725,17 @@ def analyze_canon_conformity(draft_text: str) -> List[Dict[str, Any]]:
         # Look for descriptions that might conflict
         if characters_bible:
             # Eye color check
-            eye_colors = ['blue eyes', 'green eyes', 'brown eyes', 'gray eyes', 'grey eyes', 'hazel eyes', 'amber eyes']
+            eye_colors = _EYE_COLORS
             for color in eye_colors:
                 if color in para_lower:
                     # Check if Story Bible says different
                     for other_color in eye_colors:
                         if other_color != color and other_color in characters_bible:
                             # Extract character name near the eye color
-                            import re
-                            match = re.search(r'([A-Z][a-z]+).*?' + color.replace(' ', r'\s+'), para, re.IGNORECASE)
+                            match = _EYE_COLOR_NAME_RE[color].search(para)
                             if match:
                                 char_name = match.group(1)
-                                if char_name.lower() in characters_bible:
+                                if char_name.lower() in characters_words:
                                     issues.append({
                                         "type": "character_trait",
                                         "severity": "error",
@@ -499,12 +747,10 @@ def analyze_canon_conformity(draft_text: str) -> List[Dict[str, Any]]:
                                     })
         
         # Check for dead character mentions
-        death_markers = ['died', 'dead', 'killed', 'perished', 'deceased']
-        for marker in death_markers:
+        for marker in _DEATH_MARKERS:
             if marker in para_lower:
                 # Find character name near death marker
-                import re
-                match = re.search(r'([A-Z][a-z]+).*?' + marker, para, re.IGNORECASE)
+                match = _DEATH_NAME_RE[marker].search(para)
                 if match:
                     dead_char = match.group(1).lower()
                     # Check if this character appears later in draft
@@ -580,6 +826,22 @@ def analyze_canon_conformity(draft_text: str) -> List[Dict[str, Any]]:
     return filtered_issues
 
 
+def _count_canon_severities(issues: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """(errors, warnings) in one pass over the issue list."""
+    errors = warnings = 0
+    for issue in issues:
+        sev = issue['severity']
+        if sev == 'error':
+            errors += 1
+        elif sev == 'warning':
+            warnings += 1
+    return errors, warnings
+
+
+_POV_FIRST_WORDS = frozenset({"i", "me", "my", "mine", "myself", "we", "us", "our"})
+_POV_THIRD_WORDS = frozenset({"he", "she", "they", "him", "her", "them", "his", "hers", "their"})
+
+
 def analyze_voice_conformity(text: str) -> List[Dict[str, Any]]:
     """
     Analyze how well text conforms to active Voice Bible controls.
@@ -606,8 +868,8 @@ def analyze_voice_conformity(text: str) -> List[Dict[str, Any]]:
         # Check POV conformity (if technical controls enabled)
         if st.session_state.vb_technical_on:
             pov = st.session_state.pov
-            first_person = sum(1 for w in words if w.lower() in ['i', 'me', 'my', 'mine', 'myself', 'we', 'us', 'our'])
-            third_person = sum(1 for w in words if w.lower() in ['he', 'she', 'they', 'him', 'her', 'them', 'his', 'hers', 'their'])
+            first_person = sum(1 for w in words if w in _POV_FIRST_WORDS)  # _tokenize already lowercases
+            third_person = sum(1 for w in words if w in _POV_THIRD_WORDS)
             
             if pov == "First" and third_person > first_person:
                 score -= 20
@@ -712,28 +974,36 @@ def retrieve_exemplars(voice_name: str, lane: str, query_text: str, k: int = 3)
     if not v:
         return []
     lane = lane if lane in LANES else "Narration"
-    pool = v.get("lanes", {}).get(lane, []) or []
+    pool = v.get("lanes", {}).get(lane)
     if not pool:
         return []
-    qv = _hash_vec(query_text)
-    scored = [(_cosine(qv, s.get("vec", [])), s.get("text", "")) for s in pool[-140:]]
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [txt for score, txt in scored[:k] if score > 0.0 and txt][:k]
+    scored = pool.top_k(_query_vec(query_text), k, 140)
+    return [txt for score, txt in scored if score > 0.0 and txt]
 
 
 def retrieve_mixed_exemplars(voice_name: str, lane: str, query_text: str) -> List[str]:
-    lane_ex = retrieve_exemplars(voice_name, lane, query_text, k=2)
-    if lane == "Narration":
-        return lane_ex if lane_ex else retrieve_exemplars(voice_name, "Narration", query_text, k=3)
-    nar_ex = retrieve_exemplars(voice_name, "Narration", query_text, k=1)
-    out = lane_ex + [x for x in nar_ex if x not in lane_ex]
-    return out[:3]
+    if lane not in LANES or lane == "Narration":
+        return retrieve_exemplars(voice_name, "Narration", query_text, k=2)
+    v = (st.session_state.voices or {}).get(voice_name)
+    if not v:
+        return []
+    lanes = v.get("lanes", {})
+    # lane (k=2) + Narration (k=1) scored in one pass
+    lane_sc, nar_sc = _top_k_lanes(
+        _query_vec(query_text),
+        [(lanes.get(lane) or SampleLane(), 2), (lanes.get("Narration") or SampleLane(), 1)],
+        140,
+    )
+    lane_ex = [txt for score, txt in lane_sc if score > 0.0 and txt]
+    nar_ex = [txt for score, txt in nar_sc if score > 0.0 and txt]
+    # ordered dedup in one C-level pass (also drops a sample repeated within a lane)
+    return list(dict.fromkeys(lane_ex + nar_ex))[:3]
 
 
 # ============================================================
 # LANE DETECTION (lightweight)
 # ============================================================
-THOUGHT_WORDS = {
+THOUGHT_WORDS = frozenset({
     "think",
     "thought",
     "felt",
@@ -750,8 +1020,8 @@ THOUGHT_WORDS = {
     "could",
     "should",
     "would",
-}
-ACTION_VERBS = {
+})
+ACTION_VERBS = frozenset({
     "run",
     "ran",
     "walk",
@@ -800,7 +1070,8 @@ ACTION_VERBS = {
     "moved",
     "reach",
     "reached",
-}
+})
+FIRST_PERSON_WORDS = frozenset({"i", "me", "my", "mine", "myself"})
 
 
 def detect_lane(paragraph: str) -> str:
@@ -817,17 +1088,23 @@ def detect_lane(paragraph: str) -> str:
     if has_dialogue_punct:
         dialogue_score += 1.5
 
+    # one pass over the tokens for all three counts
     toks = _tokenize(p)
+    first_person = thought_hits = verb_hits = 0
+    for t in toks:
+        if t in FIRST_PERSON_WORDS:
+            first_person += 1
+        if t in THOUGHT_WORDS:
+            thought_hits += 1
+        if t in ACTION_VERBS:
+            verb_hits += 1
+
     interior_score = 0.0
-    if toks:
-        first_person = sum(1 for t in toks if t in ("i", "me", "my", "mine", "myself"))
-        thought_hits = sum(1 for t in toks if t in THOUGHT_WORDS)
-        if first_person >= 2 and thought_hits >= 1:
-            interior_score += 2.2
+    if first_person >= 2 and thought_hits >= 1:
+        interior_score += 2.2
 
     action_score = 0.0
     if toks:
-        verb_hits = sum(1 for t in toks if t in ACTION_VERBS)
         if verb_hits >= 2:
             action_score += 1.6
         if "!" in p:
@@ -839,10 +1116,10 @@ def detect_lane(paragraph: str) -> str:
 
 
 def current_lane_from_draft(text: str) -> str:
-    paras = _split_paragraphs(text)
-    if not paras:
+    last = _last_paragraph(text)
+    if not last:
         return "Narration"
-    return detect_lane(paras[-1])
+    return detect_lane(last)
 
 
 # ============================================================
@@ -904,7 +1181,7 @@ def _verify_system_integrity() -> Dict[str, bool]:
     """
     checks = {
         "ai_intensity_exists": "ai_intensity" in st.session_state,
-        "story_bible_sections": all(k in st.session_state for k in ["synopsis", "genre_style_notes", "world", "characters", "outline"]),
+        "story_bible_sections": all(k in st.session_state for k in STORY_BIBLE_KEYS),
         "voice_bible_controls": all(k in st.session_state for k in ["vb_style_on", "vb_genre_on", "vb_trained_on", "vb_match_on", "vb_lock_on", "vb_technical_on"]),
         "style_banks_exist": "style_banks" in st.session_state,
         "voices_exist": "voices" in st.session_state,
@@ -925,24 +1202,27 @@ def _verify_system_integrity() -> Dict[str, bool]:
 # ============================================================
 # PROJECT MODEL
 # ============================================================
+def _touch_revision() -> None:
+    """Record that a project (or the workspace) changed so autosave picks it up."""
+    st.session_state["_digest_seq"] = int(st.session_state.get("_digest_seq", 0)) + 1
+
+
 def _fingerprint_story_bible(sb: Dict[str, str]) -> str:
-    parts = [
-        (sb.get("synopsis", "") or "").strip(),
-        (sb.get("genre_style_notes", "") or "").strip(),
-        (sb.get("world", "") or "").strip(),
-        (sb.get("characters", "") or "").strip(),
-        (sb.get("outline", "") or "").strip(),
-    ]
+    parts = [(sb.get(k, "") or "").strip() for k in STORY_BIBLE_KEYS]
     blob = "\n\n---\n\n".join(parts)
-    return hashlib.md5(blob.encode("utf-8")).hexdigest()
+    # change-detect only: BLAKE2b is faster than MD5 and the 16-byte digest keeps the 32-char field
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).hexdigest()
 
 
 def new_project_payload(title: str) -> Dict[str, Any]:
     ts = now_ts()
     title = title.strip() if title.strip() else "Untitled Project"
-    story_bible_id = hashlib.md5(f"sb|{title}|{ts}".encode("utf-8")).hexdigest()[:12]
+    # one random draw, two disjoint slices: project id and story bible id
+    # (a title|timestamp digest repeats for same-titled projects in one second)
+    seed = secrets.token_hex(12)
+    story_bible_id = seed[12:24]
     return {
-        "id": hashlib.md5(f"{title}|{ts}".encode("utf-8")).hexdigest()[:12],
+        "id": seed[:12],
         "title": title,
         "created_ts": ts,
         "updated_ts": ts,
@@ -951,7 +1231,7 @@ def new_project_payload(title: str) -> Dict[str, Any]:
         "story_bible_id": story_bible_id,
         "story_bible_created_ts": ts,
         "story_bible_fingerprint": "",
-        "story_bible": {"synopsis": "", "genre_style_notes": "", "world": "", "characters": "", "outline": ""},
+        "story_bible": dict.fromkeys(STORY_BIBLE_KEYS, ""),
         "voice_bible": {
             "vb_style_on": True,
             "vb_genre_on": True,
@@ -990,35 +1270,24 @@ def default_style_banks() -> Dict[str, Any]:
     return {s: {"created_ts": ts, "lanes": {ln: [] for ln in LANES}} for s in ENGINE_STYLES}
 
 
-def rebuild_vectors_in_style_banks(banks: Dict[str, Any]) -> Dict[str, Any]:
+def empty_style_banks() -> Dict[str, Any]:
+    """In-session form of default_style_banks(), built directly (no rebuild of empty lanes)."""
+    ts = now_ts()
+    return {s: {"created_ts": ts, "lanes": {ln: SampleLane() for ln in LANES}} for s in ENGINE_STYLES}
+
+
+def rebuild_vectors_in_style_banks(banks: Dict[str, Any], current: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     src = banks or {}
     out: Dict[str, Any] = {}
     for style in ENGINE_STYLES:
         b = (src.get(style) or {}) if isinstance(src, dict) else {}
         lanes = b.get("lanes") or {}
-        new_lanes: Dict[str, List[Dict[str, Any]]] = {}
-        for ln in LANES:
-            samples = (lanes.get(ln) or []) if isinstance(lanes, dict) else []
-            rebuilt: List[Dict[str, Any]] = []
-            for it in samples:
-                if isinstance(it, str):
-                    t = it.strip()
-                    if not t:
-                        continue
-                    rebuilt.append({"ts": now_ts(), "text": t, "vec": _hash_vec(t)})
-                    continue
-                if not isinstance(it, dict):
-                    continue
-                t = (it.get("text") or "").strip()
-                if not t:
-                    continue
-                vec = it.get("vec") if isinstance(it.get("vec"), list) else None
-                if not vec:
-                    vec = _hash_vec(t)
-                rebuilt.append({"ts": it.get("ts") or now_ts(), "text": t, "vec": vec})
-            new_lanes[ln] = rebuilt
+        if not isinstance(lanes, dict):
+            lanes = {}
+        prev = _lanes_of(current, style)
+        new_lanes = {ln: SampleLane.from_compact(lanes.get(ln), reuse=prev.get(ln)) for ln in LANES}
         out[style] = {"created_ts": b.get("created_ts") or now_ts(), "lanes": new_lanes}
-    return out if out else default_style_banks()
+    return out if out else empty_style_banks()
 
 
 def compact_style_banks(banks: Dict[str, Any]) -> Dict[str, Any]:
@@ -1028,22 +1297,21 @@ def compact_style_banks(banks: Dict[str, Any]) -> Dict[str, Any]:
     for style in ENGINE_STYLES:
         b = banks.get(style) or {}
         lanes = b.get("lanes") or {}
-        c_lanes: Dict[str, List[Dict[str, Any]]] = {}
+        c_lanes: Dict[str, Dict[str, Any]] = {}
         for ln in LANES:
-            ss = (lanes.get(ln) or []) if isinstance(lanes, dict) else []
-            cleaned: List[Dict[str, Any]] = []
-            for it in ss:
-                if not isinstance(it, dict):
-                    continue
-                t = (it.get("text") or "").strip()
-                if not t:
-                    continue
-                cleaned.append({"ts": it.get("ts") or now_ts(), "text": _clamp_text(t, 9000)})
-            c_lanes[ln] = cleaned
+            ts, texts = _lane_columns(lanes.get(ln) if isinstance(lanes, dict) else None)
+            c_lanes[ln] = {"ts": ts, "texts": [_clamp_text(t, 9000) for t in texts], "n": 1}
         out[style] = {"created_ts": b.get("created_ts") or now_ts(), "lanes": c_lanes}
     return out
 
 
+def _mark_style_banks_changed() -> None:
+    """Flag style banks for compaction on save and invalidate derived caches."""
+    st.session_state._dirty_style_banks = True
+    st.session_state._state_dirty = True
+    st.session_state._style_epoch = int(st.session_state.get("_style_epoch", 0)) + 1
+
+
 def add_style_samples(style: str, lane: str, raw_text: str, split_mode: str = "Paragraphs", cap_per_lane: int = 250) -> int:
     style = (style or "").strip().upper()
     if style not in ENGINE_STYLES:
@@ -1053,30 +1321,40 @@ def add_style_samples(style: str, lane: str, raw_text: str, split_mode: str = "P
     if not t.strip():
         return 0
 
-    parts = _split_paragraphs(t) if split_mode == "Paragraphs" else [t.strip()]
-    parts = [p for p in parts if len(p.strip()) >= 40]
+    # t is normalized (and stripped) once here; don't re-normalize per chunk
+    if split_mode == "Paragraphs":
+        parts = _split_normalized_paragraphs(t)
+    elif split_mode == "Sentences":
+        parts = list(_sentence_chunks(t))
+    else:
+        parts = [t]
+    parts = [p for p in parts if len(p) >= 40]
 
     sb = st.session_state.get("style_banks")
     if not isinstance(sb, dict) or style not in sb:
-        sb = rebuild_vectors_in_style_banks(default_style_banks())
+        sb = empty_style_banks()
         st.session_state.style_banks = sb
 
     bank = sb.get(style) or {}
     lanes = bank.get("lanes") or {}
-    lane_list = list((lanes.get(lane) or [])) if isinstance(lanes, dict) else []
+    lane_list = SampleLane.from_compact(lanes.get(lane)) if isinstance(lanes, dict) else SampleLane()
 
-    added = 0
+    # build the whole batch first, then one bounded extend (keeps newest).
+    # Samples already in the lane (re-training the same file) or repeated
+    # within the batch are skipped, so they're never embedded twice.
+    seen = set(lane_list.texts)
+    batch: List[str] = []
     for p in parts:
-        p = _clamp_text(p.strip(), 9000)
-        lane_list.append({"ts": now_ts(), "text": p, "vec": _hash_vec(p)})
-        added += 1
-
-    # cap: keep newest
-    lane_list = lane_list[-cap_per_lane:]
+        p = _clamp_text(p, 9000)
+        if p not in seen:
+            seen.add(p)
+            batch.append(p)
+    added = lane_list.extend(batch, [now_ts()] * len(batch), cap=cap_per_lane)
     lanes[lane] = lane_list
     bank["lanes"] = lanes
     sb[style] = bank
     st.session_state.style_banks = sb
+    _mark_style_banks_changed()
     return added
 
 
@@ -1088,7 +1366,7 @@ def delete_last_style_sample(style: str, lane: str) -> bool:
     sb = st.session_state.get("style_banks") or {}
     bank = (sb.get(style) or {})
     lanes = bank.get("lanes") or {}
-    lane_list = (lanes.get(lane) or [])
+    lane_list = lanes.get(lane)
     if not lane_list:
         return False
     lane_list.pop()
@@ -1096,6 +1374,7 @@ def delete_last_style_sample(style: str, lane: str) -> bool:
     bank["lanes"] = lanes
     sb[style] = bank
     st.session_state.style_banks = sb
+    _mark_style_banks_changed()
     return True
 
 
@@ -1104,13 +1383,14 @@ def clear_style_lane(style: str, lane: str) -> None:
     if style not in ENGINE_STYLES:
         return
     lane = lane if lane in LANES else "Narration"
-    sb = st.session_state.get("style_banks") or rebuild_vectors_in_style_banks(default_style_banks())
+    sb = st.session_state.get("style_banks") or empty_style_banks()
     bank = sb.get(style) or {}
     lanes = bank.get("lanes") or {}
-    lanes[lane] = []
+    lanes[lane] = SampleLane()
     bank["lanes"] = lanes
     sb[style] = bank
     st.session_state.style_banks = sb
+    _mark_style_banks_changed()
 
 
 def retrieve_style_exemplars(style: str, lane: str, query: str, k: int = 2) -> List[str]:
@@ -1121,49 +1401,24 @@ def retrieve_style_exemplars(style: str, lane: str, query: str, k: int = 2) -> L
     sb = st.session_state.get("style_banks") or {}
     bank = sb.get(style) or {}
     lanes = bank.get("lanes") or {}
-    pool = (lanes.get(lane) or [])
+    pool = lanes.get(lane)
     if not pool:
         # fallback: all lanes pooled
-        pool = []
-        for ln in LANES:
-            pool.extend(lanes.get(ln) or [])
+        pool = SampleLane.merged([lanes[ln] for ln in LANES if lanes.get(ln)], 160)
     if not pool:
         return []
     # favor newest slice for speed
-    pool = pool[-160:]
-    qv = _hash_vec(query or "")
-    scored = []
-    for it in pool:
-        if not isinstance(it, dict):
-            continue
-        vec = it.get("vec")
-        if not isinstance(vec, list):
-            continue
-        scored.append((_cosine(qv, vec), it.get("text") or ""))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    out = [t.strip() for _, t in scored[: max(0, k)] if (t or "").strip()]
+    scored = pool.top_k(_query_vec(query or ""), k, 160)
+    out = [t.strip() for _, t in scored if (t or "").strip()]
     return out
 
 
-_ENGINE_STYLE_GUIDE = {
-    "NARRATIVE": "Narrative clarity, clean cause→effect, confident pacing. Prioritize story logic and readability.",
-    "DESCRIPTIVE": "Sensory precision, spatial clarity, vivid concrete nouns, controlled detail density (no purple bloat).",
-    "EMOTIONAL": "Interior depth, subtext, emotional specificity. Show the feeling through behavior, sensation, and thought.",
-    "LYRICAL": "Rhythm, musical syntax, image-forward language, elegant metaphor with restraint. Make prose sing without obscuring meaning.",
-}
-
-
 def engine_style_directive(style: str, intensity: float, lane: str) -> str:
-    style = (style or "").strip().upper()
-    base = _ENGINE_STYLE_GUIDE.get(style, "")
+    # the text only depends on which of three intensity bands x falls in,
+    # so memoize on (style, band, lane) rather than the raw slider value
     x = float(intensity)
-    if x <= 0.33:
-        mod = "Keep it subtle and controlled. Minimal overt stylization."
-    elif x <= 0.66:
-        mod = "Medium stylization. Let the style clearly shape diction and cadence."
-    else:
-        mod = "High stylization. Strong stylistic fingerprint, but still professional and coherent."
-    return f"{base}\\nLane: {lane}\\n{mod}"
+    band = 0 if x <= 0.33 else 1 if x <= 0.66 else 2
+    return make_engine_style_directive((style or "").strip().upper(), band, lane)
 
 
 # STORY BIBLE WORKSPACE (pre-project creation space)
@@ -1171,11 +1426,11 @@ def engine_style_directive(style: str, intensity: float, lane: str) -> str:
 def default_story_bible_workspace() -> Dict[str, Any]:
     ts = now_ts()
     return {
-        "workspace_story_bible_id": hashlib.md5(f"wsb|{ts}".encode("utf-8")).hexdigest()[:12],
+        "workspace_story_bible_id": secrets.token_hex(6),
         "workspace_story_bible_created_ts": ts,
         "title": "",
         "draft": "",
-        "story_bible": {"synopsis": "", "genre_style_notes": "", "world": "", "characters": "", "outline": ""},
+        "story_bible": dict.fromkeys(STORY_BIBLE_KEYS, ""),
         "voice_sample": "",
         "ai_intensity": 0.75,
         "voices": default_voice_vault(),
@@ -1189,20 +1444,25 @@ def in_workspace_mode() -> bool:
 
 def save_workspace_from_session() -> None:
     w = st.session_state.sb_workspace or default_story_bible_workspace()
-    w["title"] = st.session_state.get("workspace_title", w.get("title", ""))
-    w["draft"] = st.session_state.main_text
-    w["story_bible"] = {
-        "synopsis": st.session_state.synopsis,
-        "genre_style_notes": st.session_state.genre_style_notes,
-        "world": st.session_state.world,
-        "characters": st.session_state.characters,
-        "outline": st.session_state.outline,
+    fresh = {
+        "title": st.session_state.get("workspace_title", w.get("title", "")),
+        "draft": st.session_state.main_text,
+        "story_bible": {k: st.session_state[k] for k in STORY_BIBLE_KEYS},
+        "voice_sample": st.session_state.voice_sample,
+        "ai_intensity": float(st.session_state.ai_intensity),
     }
-    w["voice_sample"] = st.session_state.voice_sample
-    w["ai_intensity"] = float(st.session_state.ai_intensity)
-    w["voices"] = compact_voice_vault(st.session_state.voices)
-    w["style_banks"] = compact_style_banks(st.session_state.get("style_banks") or rebuild_vectors_in_style_banks(default_style_banks()))
+    if st.session_state.get("_dirty_voices", True):
+        fresh["voices"] = compact_voice_vault(st.session_state.voices)
+    if st.session_state.get("_dirty_style_banks", True):
+        fresh["style_banks"] = compact_style_banks(st.session_state.get("style_banks") or default_style_banks())
+    changed = [k for k, v in fresh.items() if w.get(k) != v]
+    if changed:
+        for k in changed:
+            w[k] = fresh[k]
+        _touch_revision()
     st.session_state.sb_workspace = w
+    st.session_state._dirty_voices = False
+    st.session_state._dirty_style_banks = False
 
 
 def set_ai_intensity(val: float) -> None:
@@ -1228,9 +1488,16 @@ def load_workspace_into_session() -> None:
     st.session_state.outline = sb.get("outline", "") or ""
     st.session_state.voice_sample = w.get("voice_sample", "") or ""
     set_ai_intensity(float(w.get("ai_intensity", 0.75)))
-    st.session_state.voices = rebuild_vectors_in_voice_vault(w.get("voices", default_voice_vault()))
+    # build the default vault/banks only when the key is actually missing
+    st.session_state.voices = (
+        rebuild_vectors_in_voice_vault(w["voices"], st.session_state.get("voices")) if "voices" in w else empty_voice_vault()
+    )
     st.session_state.voices_seeded = True
-    st.session_state.style_banks = rebuild_vectors_in_style_banks(w.get("style_banks", default_style_banks()))
+    st.session_state.style_banks = (
+        rebuild_vectors_in_style_banks(w["style_banks"], st.session_state.get("style_banks")) if "style_banks" in w else empty_style_banks()
+    )
+    _mark_voices_changed()
+    _mark_style_banks_changed()
     st.session_state.workspace_title = w.get("title", "") or ""
 
 
@@ -1240,9 +1507,13 @@ def reset_workspace_story_bible(keep_templates: bool = True) -> None:
     if keep_templates:
         neww["voice_sample"] = old.get("voice_sample", "")
         neww["ai_intensity"] = float(old.get("ai_intensity", 0.75))
-        neww["voices"] = old.get("voices", default_voice_vault())
-        neww["style_banks"] = old.get("style_banks", default_style_banks())
+        # neww already carries fresh defaults; only replace them when old has its own
+        if "voices" in old:
+            neww["voices"] = old["voices"]
+        if "style_banks" in old:
+            neww["style_banks"] = old["style_banks"]
     st.session_state.sb_workspace = neww
+    _touch_revision()
     if in_workspace_mode():
         load_workspace_into_session()
 
@@ -1250,71 +1521,91 @@ def reset_workspace_story_bible(keep_templates: bool = True) -> None:
 # ============================================================
 # SESSION INIT
 # ============================================================
+# Session defaults, built once. Mutable values are factories (called only for a
+# missing key), so reruns don't rebuild the default workspace/banks just to
+# discard them.
+_SESSION_DEFAULTS: Dict[str, Any] = {
+    "active_bay": "NEW",
+    "projects": dict,
+    "active_project_by_bay": lambda: {b: None for b in BAYS},
+    "sb_workspace": default_story_bible_workspace,
+    "workspace_title": "",
+    "project_id": None,
+    "project_title": "—",
+    "autosave_time": None,
+    "last_action": "—",
+    "voice_status": "—",
+    "main_text": "",
+    "synopsis": "",
+    "genre_style_notes": "",
+    "world": "",
+    "characters": "",
+    "outline": "",
+    "junk": "",
+    "tool_output": "",
+    "pending_action": None,
+    "vb_style_on": True,
+    "vb_genre_on": True,
+    "vb_trained_on": False,
+    "vb_match_on": False,
+    "vb_lock_on": False,
+    "vb_technical_on": True,
+    "writing_style": "Neutral",
+    "genre": "Literary",
+    "trained_voice": "— None —",
+    "voice_sample": "",
+    "voice_lock_prompt": "",
+    "style_intensity": 0.6,
+    "genre_intensity": 0.6,
+    "trained_intensity": 0.7,
+    "match_intensity": 0.8,
+    "lock_intensity": 1.0,
+    "technical_intensity": 0.8,
+    "pov": "Close Third",
+    "tense": "Past",
+    "ai_intensity": 0.75,
+    "locks": lambda: {
+        "story_bible_lock": True,
+        "sb_edit_unlocked": False,
+        "voice_fingerprint_lock": True,
+        "lane_lock": False,
+        "forced_lane": "Narration",
+    },
+    "voices": dict,
+    "voices_seeded": False,
+    "style_banks": empty_style_banks,
+    # vault/bank compaction is skipped on save unless these are set
+    "_dirty_voices": True,
+    "_dirty_style_banks": True,
+    # set by autosave()/_mark_*_changed(); while clear, idle reruns skip save_current_context()
+    "_state_dirty": True,
+    "_voice_epoch": 0,
+    "_style_epoch": 0,
+    "_brief_cache": OrderedDict,
+    "last_saved_digest": (),
+    "_last_state_hash": b"",
+    "projects_by_bay": lambda: {b: set() for b in BAYS},
+    "_bay_list_cache": dict,
+    # /find: label -> (text, lowercased lines, their "\n" join, line starts);
+    # reused until that text changes
+    "_find_cache": dict,
+    "_digest_seq": 0,
+    "analyzed_style_samples": list,
+    "voice_heatmap_data": list,
+    "show_voice_heatmap": False,
+    "canon_guardian_on": False,
+    "canon_issues": list,
+    "canon_ignored_flags": list,
+
+    # internal UI helpers (not widgets)
+    "ui_notice": "",
+}
+
+
 def init_state() -> None:
-    defaults: Dict[str, Any] = {
-        "active_bay": "NEW",
-        "projects": {},
-        "active_project_by_bay": {b: None for b in BAYS},
-        "sb_workspace": default_story_bible_workspace(),
-        "workspace_title": "",
-        "project_id": None,
-        "project_title": "—",
-        "autosave_time": None,
-        "last_action": "—",
-        "voice_status": "—",
-        "main_text": "",
-        "synopsis": "",
-        "genre_style_notes": "",
-        "world": "",
-        "characters": "",
-        "outline": "",
-        "junk": "",
-        "tool_output": "",
-        "pending_action": None,
-        "vb_style_on": True,
-        "vb_genre_on": True,
-        "vb_trained_on": False,
-        "vb_match_on": False,
-        "vb_lock_on": False,
-        "vb_technical_on": True,
-        "writing_style": "Neutral",
-        "genre": "Literary",
-        "trained_voice": "— None —",
-        "voice_sample": "",
-        "voice_lock_prompt": "",
-        "style_intensity": 0.6,
-        "genre_intensity": 0.6,
-        "trained_intensity": 0.7,
-        "match_intensity": 0.8,
-        "lock_intensity": 1.0,
-        "technical_intensity": 0.8,
-        "pov": "Close Third",
-        "tense": "Past",
-        "ai_intensity": 0.75,
-        "locks": {
-            "story_bible_lock": True,
-            "sb_edit_unlocked": False,
-            "voice_fingerprint_lock": True,
-            "lane_lock": False,
-            "forced_lane": "Narration",
-        },
-        "voices": {},
-        "voices_seeded": False,
-        "style_banks": rebuild_vectors_in_style_banks(default_style_banks()),
-        "last_saved_digest": "",
-        "analyzed_style_samples": [],
-        "voice_heatmap_data": [],
-        "show_voice_heatmap": False,
-        "canon_guardian_on": False,
-        "canon_issues": [],
-        "canon_ignored_flags": [],
-
-        # internal UI helpers (not widgets)
-        "ui_notice": "",
-    }
-    for k, v in defaults.items():
+    for k, v in _SESSION_DEFAULTS.items():
         if k not in st.session_state:
-            st.session_state[k] = v
+            st.session_state[k] = v() if callable(v) else v
 
 
 init_state()
@@ -1330,6 +1621,31 @@ if st.session_state.pop("_apply_pending_widget_state", False):
 # ============================================================
 # PROJECT <-> SESSION SYNC
 # ============================================================
+# Session fields persisted as a project's "voice_bible" (built once, not per load/save)
+_VOICE_BIBLE_KEYS = (
+    "vb_style_on",
+    "vb_genre_on",
+    "vb_trained_on",
+    "vb_match_on",
+    "vb_lock_on",
+    "vb_technical_on",
+    "writing_style",
+    "genre",
+    "trained_voice",
+    "voice_sample",
+    "voice_lock_prompt",
+    "style_intensity",
+    "genre_intensity",
+    "trained_intensity",
+    "match_intensity",
+    "lock_intensity",
+    "technical_intensity",
+    "pov",
+    "tense",
+    "ai_intensity",
+)
+
+
 def load_project_into_session(pid: str) -> None:
     p = (st.session_state.projects or {}).get(pid)
     if not p:
@@ -1347,35 +1663,19 @@ def load_project_into_session(pid: str) -> None:
     st.session_state.outline = sb.get("outline", "")
 
     vb = p.get("voice_bible", {}) or {}
-    for k in [
-        "vb_style_on",
-        "vb_genre_on",
-        "vb_trained_on",
-        "vb_match_on",
-        "vb_lock_on",
-        "vb_technical_on",
-        "writing_style",
-        "genre",
-        "trained_voice",
-        "voice_sample",
-        "voice_lock_prompt",
-        "style_intensity",
-        "genre_intensity",
-        "trained_intensity",
-        "match_intensity",
-        "lock_intensity",
-        "technical_intensity",
-        "pov",
-        "tense",
-        "ai_intensity",
-    ]:
+    for k in _VOICE_BIBLE_KEYS:
         if k in vb:
             st.session_state[k] = vb[k]
 
     # locks removed: Story Bible is always editable
 
-    st.session_state.voices = rebuild_vectors_in_voice_vault(p.get("voices", default_voice_vault()))
+    st.session_state.voices = (
+        rebuild_vectors_in_voice_vault(p["voices"], st.session_state.get("voices")) if "voices" in p else empty_voice_vault()
+    )
     st.session_state.voices_seeded = True
+    # style_banks stay session-wide, but this project's copy must be refreshed too
+    _mark_voices_changed()
+    _mark_style_banks_changed()
 
 
 def save_session_into_project() -> None:
@@ -1386,54 +1686,102 @@ def save_session_into_project() -> None:
     if not p:
         return
 
-    p["updated_ts"] = now_ts()
-    p["draft"] = st.session_state.main_text
-    p["story_bible"] = {
-        "synopsis": st.session_state.synopsis,
-        "genre_style_notes": st.session_state.genre_style_notes,
-        "world": st.session_state.world,
-        "characters": st.session_state.characters,
-        "outline": st.session_state.outline,
-    }
-    p["voice_bible"] = {
-        "vb_style_on": st.session_state.vb_style_on,
-        "vb_genre_on": st.session_state.vb_genre_on,
-        "vb_trained_on": st.session_state.vb_trained_on,
-        "vb_match_on": st.session_state.vb_match_on,
-        "vb_lock_on": st.session_state.vb_lock_on,
-        "vb_technical_on": st.session_state.vb_technical_on,
-        "writing_style": st.session_state.writing_style,
-        "genre": st.session_state.genre,
-        "trained_voice": st.session_state.trained_voice,
-        "voice_sample": st.session_state.voice_sample,
-        "voice_lock_prompt": st.session_state.voice_lock_prompt,
-        "style_intensity": st.session_state.style_intensity,
-        "genre_intensity": st.session_state.genre_intensity,
-        "trained_intensity": st.session_state.trained_intensity,
-        "match_intensity": st.session_state.match_intensity,
-        "lock_intensity": st.session_state.lock_intensity,
-        "technical_intensity": st.session_state.technical_intensity,
-        "pov": st.session_state.pov,
-        "tense": st.session_state.tense,
-        "ai_intensity": float(st.session_state.ai_intensity),
-    }
+    fresh: Dict[str, Any] = {}
+    fresh["draft"] = st.session_state.main_text
+    fresh["story_bible"] = {k: st.session_state[k] for k in STORY_BIBLE_KEYS}
+    fresh["voice_bible"] = {k: st.session_state[k] for k in _VOICE_BIBLE_KEYS}
+    fresh["voice_bible"]["ai_intensity"] = float(st.session_state.ai_intensity)
     # locks removed: Story Bible is always editable
-    p["voices"] = compact_voice_vault(st.session_state.voices)
-    p["style_banks"] = compact_style_banks(st.session_state.get("style_banks") or rebuild_vectors_in_style_banks(default_style_banks()))
+    if st.session_state.get("_dirty_voices", True):
+        fresh["voices"] = compact_voice_vault(st.session_state.voices)
+    if st.session_state.get("_dirty_style_banks", True):
+        fresh["style_banks"] = compact_style_banks(st.session_state.get("style_banks") or default_style_banks())
+    st.session_state._dirty_voices = False
+    st.session_state._dirty_style_banks = False
+    # only bump updated_ts / the autosave revision when something actually changed,
+    # and only write back (and re-fingerprint) the containers that did
+    changed = [k for k, v in fresh.items() if p.get(k) != v]
+    if not changed:
+        return
+    for k in changed:
+        p[k] = fresh[k]
+    p["updated_ts"] = now_ts()
     # keep fingerprint up to date
-    try:
-        p["story_bible_fingerprint"] = _fingerprint_story_bible(p["story_bible"])
-    except Exception:
-        pass
+    if "story_bible" in changed or not p.get("story_bible_fingerprint"):
+        try:
+            p["story_bible_fingerprint"] = _fingerprint_story_bible(p["story_bible"])
+        except Exception:
+            pass
+    _touch_revision()
 
 
-def list_projects_in_bay(bay: str) -> List[Tuple[str, str]]:
-    items: List[Tuple[str, str]] = []
+def _index_project_bay(pid: str) -> None:
+    """Move pid into the bay index matching its current `bay` field."""
+    index: Dict[str, Set[str]] = st.session_state.projects_by_bay
+    touched = {b for b, members in index.items() if pid in members}
+    for b in touched:
+        index[b].discard(pid)
+    p = (st.session_state.projects or {}).get(pid)
+    if isinstance(p, dict) and p.get("bay") in BAYS:
+        index.setdefault(p["bay"], set()).add(pid)
+        touched.add(p["bay"])
+    # only the bays pid left or joined need their sorted lists / selectors rebuilt
+    cache: Dict[Any, Any] = st.session_state["_bay_list_cache"]
+    for b in touched:
+        cache.pop(b, None)
+        cache.pop(("selector", b), None)
+
+
+def _rebuild_bay_index() -> None:
+    index: Dict[str, Set[str]] = {b: set() for b in BAYS}
     for pid, p in (st.session_state.projects or {}).items():
-        if isinstance(p, dict) and p.get("bay") == bay:
-            items.append((pid, p.get("title", "Untitled")))
-    items.sort(key=lambda x: (x[1] or "").lower())
-    return items
+        if isinstance(p, dict) and p.get("bay") in BAYS:
+            index[p["bay"]].add(pid)
+    st.session_state.projects_by_bay = index
+    st.session_state["_bay_list_cache"] = {}
+
+
+def list_projects_in_bay(bay: str) -> List[Tuple[str, str]]:
+    cache: Dict[Any, Any] = st.session_state["_bay_list_cache"]
+    if bay not in cache:
+        projects = st.session_state.projects or {}
+        items: List[Tuple[str, str]] = []
+        for pid in st.session_state.projects_by_bay.get(bay, ()):
+            p = projects.get(pid)
+            if isinstance(p, dict) and p.get("bay") == bay:
+                items.append((pid, p.get("title", "Untitled")))
+        items.sort(key=lambda x: (x[1] or "").lower())
+        cache[bay] = items
+    return list(cache[bay])
+
+
+def bay_selector_options(bay: str) -> Tuple[List[str], List[Optional[str]], Dict[Optional[str], int], Dict[str, int]]:
+    """
+    (labels, ids, id→index, label→index) for the bay project selector,
+    cached alongside list_projects_in_bay() and invalidated with it.
+    """
+    cache: Dict[Any, Any] = st.session_state["_bay_list_cache"]
+    key = ("selector", bay)
+    if key not in cache:
+        # Build a stable selector with unique labels (handles duplicate titles)
+        head = "— (Story Bible workspace) —" if bay == "NEW" else "— (none) —"
+        items: List[Tuple[Optional[str], str]] = [(None, head)] + list_projects_in_bay(bay)
+
+        # Disambiguate duplicate titles
+        seen: Dict[str, int] = {}
+        labels: List[str] = []
+        ids: List[Optional[str]] = []
+        for pid, title in items:
+            seen[title] = seen.get(title, 0) + 1
+            labels.append(title if seen[title] == 1 else f"{title}  ·  {str(pid)[-4:]}")
+            ids.append(pid)
+        id_to_idx: Dict[Optional[str], int] = {}
+        label_to_idx: Dict[str, int] = {}
+        for i, (pid, label) in enumerate(zip(ids, labels)):
+            id_to_idx.setdefault(pid, i)
+            label_to_idx.setdefault(label, i)
+        cache[key] = (labels, ids, id_to_idx, label_to_idx)
+    return cache[key]
 
 
 def ensure_bay_has_active_project(bay: str) -> None:
@@ -1472,8 +1820,9 @@ def switch_bay(target_bay: str) -> None:
             st.session_state.outline = ""
             st.session_state.voice_sample = ""
             set_ai_intensity(0.75)
-            st.session_state.voices = rebuild_vectors_in_voice_vault(default_voice_vault())
+            st.session_state.voices = empty_voice_vault()
             st.session_state.voices_seeded = True
+            _mark_voices_changed()
             st.session_state.voice_status = f"{target_bay}: (empty)"
 
     st.session_state.last_action = f"Bay → {target_bay}"
@@ -1497,13 +1846,7 @@ def create_project_from_current_bible(title: str) -> str:
     p = new_project_payload(title)
     p["bay"] = "NEW"
     p["draft"] = st.session_state.main_text
-    p["story_bible"] = {
-        "synopsis": st.session_state.synopsis,
-        "genre_style_notes": st.session_state.genre_style_notes,
-        "world": st.session_state.world,
-        "characters": st.session_state.characters,
-        "outline": st.session_state.outline,
-    }
+    p["story_bible"] = {k: st.session_state[k] for k in STORY_BIBLE_KEYS}
 
     if source == "workspace" and source_story_bible_id:
         p["story_bible_id"] = source_story_bible_id
@@ -1517,10 +1860,12 @@ def create_project_from_current_bible(title: str) -> str:
     p["voice_bible"]["voice_sample"] = st.session_state.voice_sample
     p["voice_bible"]["ai_intensity"] = float(st.session_state.ai_intensity)
     p["voices"] = compact_voice_vault(st.session_state.voices)
-    p["style_banks"] = compact_style_banks(st.session_state.get("style_banks") or rebuild_vectors_in_style_banks(default_style_banks()))
+    p["style_banks"] = compact_style_banks(st.session_state.get("style_banks") or default_style_banks())
 
     st.session_state.projects[p["id"]] = p
     st.session_state.active_project_by_bay["NEW"] = p["id"]
+    _index_project_bay(p["id"])
+    _touch_revision()
 
     if source == "workspace":
         reset_workspace_story_bible(keep_templates=True)
@@ -1534,6 +1879,8 @@ def promote_project(pid: str, to_bay: str) -> None:
         return
     p["bay"] = to_bay
     p["updated_ts"] = now_ts()
+    _index_project_bay(pid)
+    _touch_revision()
 
 
 def next_bay(bay: str) -> Optional[str]:
@@ -1549,13 +1896,17 @@ def next_bay(bay: str) -> Optional[str]:
 # ============================================================
 # AUTOSAVE (atomic + backup)
 # ============================================================
-def _payload() -> Dict[str, Any]:
+def save_current_context() -> None:
+    """Flush live session fields into the active project or the workspace."""
     if in_workspace_mode():
         save_workspace_from_session()
     else:
         save_session_into_project()
+
+
+def _payload() -> Dict[str, Any]:
+    """Autosave body. The "meta" block is framed on after hashing (see _frame_chunks)."""
     return {
-        "meta": {"saved_at": now_ts(), "version": "olivetti-prod-stable-v1"},
         "active_bay": st.session_state.active_bay,
         "active_project_by_bay": st.session_state.active_project_by_bay,
         "sb_workspace": st.session_state.sb_workspace,
@@ -1563,69 +1914,128 @@ def _payload() -> Dict[str, Any]:
     }
 
 
-def _digest(payload: Dict[str, Any]) -> str:
-    s = json.dumps(payload, ensure_ascii=False, sort_keys=True)
-    return hashlib.md5(s.encode("utf-8")).hexdigest()
+def _digest() -> Tuple[Any, ...]:
+    """
+    Cheap change signature for autosave: bay pointers plus the head of the
+    revision sequence. Every _touch_revision() advances _digest_seq, so
+    projects never need re-hashing here — O(#bays), never serializes
+    drafts or walks projects. The tuple is small and made of
+    plain strings/ints, so it is compared as-is; no canonical encoding or
+    hash pass is needed to make it stable.
+    """
+    return (
+        st.session_state.active_bay,
+        tuple((b, (st.session_state.active_project_by_bay or {}).get(b) or "") for b in BAYS),
+        int(st.session_state.get("_digest_seq", 0)),
+    )
 
 
-def save_all_to_disk(force: bool = False) -> None:
-    """Autosave state to disk with an atomic write and a simple backup."""
-    try:
-        os.makedirs(AUTOSAVE_DIR, exist_ok=True)
-        payload = _payload()
-        dig = _digest(payload)
-        if (not force) and dig == st.session_state.last_saved_digest:
-            return
+def _serialize_payload(payload: Dict[str, Any]) -> bytes:
+    # compact JSON: the file is gzipped, pretty-printing would only cost bytes
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _frame_chunks(body: bytes) -> Tuple[bytes, memoryview]:
+    """
+    The autosave file as two chunks: a small '{"meta":...,' head and a view of
+    the serialized _payload() body past its opening brace. The body is never
+    copied or concatenated; the writer streams both chunks into gzip.
+    """
+    meta = _serialize_payload({"saved_at": now_ts(), "version": "olivetti-prod-stable-v1"})
+    return b'{"meta":' + meta + b",", memoryview(body)[1:]
+
+
+AUTOSAVE_BACKUP_EVERY = 20  # roll the .bak on the first write, then every Nth
 
-        tmp_path = AUTOSAVE_PATH + ".tmp"
-        bak_path = AUTOSAVE_PATH + ".bak"
 
+def _write_autosave_chunks(chunks: Sequence[Any], backup: bool = True) -> None:
+    """Optionally backup the previous file, then stream gzip to a temp file + fsync + os.replace (crash-safe)."""
+    import tempfile
+
+    os.makedirs(AUTOSAVE_DIR, exist_ok=True)
+
+    if backup and os.path.exists(AUTOSAVE_PATH):
+        # hard-link the current file as the backup (no bytes copied); the
+        # os.replace below swaps in a new inode, so the link keeps the old data
+        bak = AUTOSAVE_PATH + ".bak"
         try:
-            if os.path.exists(AUTOSAVE_PATH):
+            try:
+                os.remove(bak + ".new")
+            except FileNotFoundError:
+                pass
+            os.link(AUTOSAVE_PATH, bak + ".new")
+            os.replace(bak + ".new", bak)
+        except OSError:
+            try:
                 import shutil
 
-                shutil.copy2(AUTOSAVE_PATH, bak_path)
-        except Exception:
-            pass
+                shutil.copy2(AUTOSAVE_PATH, bak)  # filesystems without hard links
+            except Exception:
+                pass
 
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+    fd, tmp_path = tempfile.mkstemp(dir=AUTOSAVE_DIR, prefix=".olivetti_state.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=1) as gz:
+                for chunk in chunks:
+                    gz.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
         os.replace(tmp_path, AUTOSAVE_PATH)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 
+def save_all_to_disk(force: bool = False) -> None:
+    """
+    Autosave state to disk. The payload is snapshotted (serialized) on the
+    script thread; the atomic write + backup happen on a background writer.
+    """
+    try:
+        writer = _autosave_writer()
+        err = writer.pop_error()
+        if err:
+            st.session_state.voice_status = f"Autosave warning: {err}"
+            st.session_state.last_saved_digest = ()  # retry on this pass
+            st.session_state._last_state_hash = b""
+            st.session_state._state_dirty = True
+
+        if not (force or st.session_state.get("_state_dirty", True)) and _digest() == st.session_state.last_saved_digest:
+            return  # idle rerun: no edits marked and no bay/project pointer moved
+        save_current_context()
+        st.session_state._state_dirty = False
+        dig = _digest()
+        if (not force) and dig == st.session_state.last_saved_digest:
+            return
+        # revisions can move without the content changing (e.g. A→B→A bay hops);
+        # hash the body (timestamp-free) and skip the write if it's what we last sent
+        body = _serialize_payload(_payload())
+        h = hashlib.blake2b(body, digest_size=16).digest()
+        if h != st.session_state.get("_last_state_hash"):
+            writer.submit(_frame_chunks(body), immediate=force)
+            st.session_state._last_state_hash = h
         st.session_state.last_saved_digest = dig
     except Exception as e:
         st.session_state.voice_status = f"Autosave warning: {e}"
 
 
 def load_all_from_disk() -> None:
-    main_path = AUTOSAVE_PATH
-    bak_path = AUTOSAVE_PATH + ".bak"
-
     def _boot_new() -> None:
         st.session_state.sb_workspace = st.session_state.get("sb_workspace") or default_story_bible_workspace()
         switch_bay("NEW")
 
-    if (not os.path.exists(main_path)) and (not os.path.exists(bak_path)):
-        _boot_new()
-        return
-
-    payload = None
-    loaded_from = "primary"
-    last_err = None
-    for path, label in ((main_path, "primary"), (bak_path, "backup")):
-        if not os.path.exists(path):
-            continue
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                payload = json.load(f)
-            loaded_from = label
-            break
-        except Exception as e:
-            last_err = e
-            payload = None
+    prefetch = st.session_state.pop("_autosave_prefetch", None)
+    payload, loaded_from, last_err = prefetch.result() if prefetch is not None else _read_first_autosave(_autosave_writer())
 
     if payload is None:
-        st.session_state.voice_status = f"Load warning: {last_err}"
+        if last_err is not None:
+            st.session_state.voice_status = f"Load warning: {last_err}"
         _boot_new()
         return
 
@@ -1636,6 +2046,9 @@ def load_all_from_disk() -> None:
 
         apbb = payload.get("active_project_by_bay", {})
         if isinstance(apbb, dict):
+            # parsed keys are fresh strings; intern them so lookups with the BAYS
+            # literals (already interned) hit on identity
+            apbb = {sys.intern(k): v for k, v in apbb.items()}
             for b in BAYS:
                 apbb.setdefault(b, None)
             st.session_state.active_project_by_bay = apbb
@@ -1654,13 +2067,18 @@ def load_all_from_disk() -> None:
             title = p.get("title", "Untitled")
             p.setdefault("story_bible_id", hashlib.md5(f"sb|{title}|{ts}".encode("utf-8")).hexdigest()[:12])
             p.setdefault("story_bible_created_ts", ts)
-            p.setdefault("voices", default_voice_vault())
-            p.setdefault("style_banks", default_style_banks())
+            if isinstance(p.get("bay"), str):
+                p["bay"] = sys.intern(p["bay"])
+            if "voices" not in p:
+                p["voices"] = default_voice_vault()
+            if "style_banks" not in p:
+                p["style_banks"] = default_style_banks()
             if "story_bible_fingerprint" not in p:
                 try:
                     p["story_bible_fingerprint"] = _fingerprint_story_bible(p.get("story_bible", {}) or {})
                 except Exception:
                     p["story_bible_fingerprint"] = ""
+        _rebuild_bay_index()
 
         ab = payload.get("active_bay", "NEW")
         if ab not in BAYS:
@@ -1681,7 +2099,8 @@ def load_all_from_disk() -> None:
         saved_at = (payload.get("meta", {}) or {}).get("saved_at", "")
         src = "autosave" if loaded_from == "primary" else "backup autosave"
         st.session_state.voice_status = f"Loaded {src} ({saved_at})."
-        st.session_state.last_saved_digest = _digest(_payload())
+        save_current_context()
+        st.session_state.last_saved_digest = _digest()
     except Exception as e:
         st.session_state.voice_status = f"Load warning: {e}"
         _boot_new()
@@ -1702,9 +2121,17 @@ if "did_load_autosave" not in st.session_state:
             st.stop()
 
 
-def autosave() -> None:
+def autosave(flush: bool = False) -> None:
+    """
+    Mark state as changed. Ordinary edits (widget on_change callbacks) are
+    picked up by the save_all_to_disk() at the end of the rerun and the
+    writer debounces them; flush=True is for structural changes (create /
+    promote / select) and writes without waiting out the debounce window.
+    """
     st.session_state.autosave_time = datetime.now().strftime("%H:%M:%S")
-    save_all_to_disk()
+    st.session_state._state_dirty = True
+    if flush:
+        save_all_to_disk(force=True)
 
 
 # ============================================================
@@ -1715,12 +2142,32 @@ def _read_uploaded_text(uploaded) -> Tuple[str, str]:
     if uploaded is None:
         return "", ""
     name = getattr(uploaded, "name", "") or ""
+    size = getattr(uploaded, "size", None)
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        return "", name  # reject before copying the buffer out
+    ext = os.path.splitext(name.lower())[1]
+
+    if ext == ".docx":
+        try:
+            from docx import Document  # python-docx
+
+            # UploadedFile is already a seekable in-memory file: hand it to
+            # python-docx as-is instead of copying it into a second BytesIO
+            if hasattr(uploaded, "seek"):
+                uploaded.seek(0)
+                doc = Document(uploaded)
+            else:
+                doc = Document(BytesIO(uploaded.getvalue()))
+            texts = ((p.text or "").strip() for p in doc.paragraphs)
+            return "\n\n".join(t for t in texts if t), name
+        except Exception:
+            pass  # not a real .docx: fall through and decode the bytes
+
     raw = uploaded.getvalue()
     if raw is None:
         return "", name
     if len(raw) > MAX_UPLOAD_BYTES:
         return "", name
-    ext = os.path.splitext(name.lower())[1]
 
     if ext in (".txt", ".md", ".markdown", ".text", ""):
         try:
@@ -1728,56 +2175,43 @@ def _read_uploaded_text(uploaded) -> Tuple[str, str]:
         except Exception:
             return raw.decode("utf-8", errors="ignore"), name
 
-    if ext == ".docx":
-        try:
-            from docx import Document  # python-docx
-
-            doc = Document(BytesIO(raw))
-            parts = []
-            for p in doc.paragraphs:
-                t = (p.text or "").strip()
-                if t:
-                    parts.append(t)
-            return "\n\n".join(parts), name
-        except Exception:
-            try:
-                return raw.decode("utf-8", errors="ignore"), name
-            except Exception:
-                return "", name
-
     try:
         return raw.decode("utf-8", errors="ignore"), name
     except Exception:
         return "", name
 
 
-def _sb_sections_from_text_heuristic(text: str) -> Dict[str, str]:
-    t = _normalize_text(text)
+_SB_HEADING_MAP = {
+    "synopsis": ["synopsis", "premise", "logline"],
+    "genre_style_notes": ["genre", "style", "tone", "voice"],
+    "world": ["world", "setting", "lore"],
+    "characters": ["characters", "cast"],
+    "outline": ["outline", "beats", "plot", "structure"],
+}
+# every alias is one word, so "line == alias or line.startswith(alias + ' ')" is a lookup on the first word
+_SB_HEADING_ALIASES = {a: key for key, aliases in _SB_HEADING_MAP.items() for a in aliases}
+_HEADING_LEAD_RE = re.compile(r"^[#\-\*\s]+")
+_HEADING_TRAIL_RE = re.compile(r"[:\-\s]+$")
+
+
+def _match_sb_heading(line: str) -> Optional[str]:
+    l = _HEADING_LEAD_RE.sub("", (line or "").strip()).lower()
+    l = _HEADING_TRAIL_RE.sub("", l)
+    return _SB_HEADING_ALIASES.get(l.partition(" ")[0])
+
+
+def _sb_sections_from_text_heuristic(text: str, normalized: bool = False) -> Dict[str, str]:
+    """`normalized=True` when the caller already ran `text` through _normalize_text."""
+    t = text if normalized else _normalize_text(text)
     if not t:
-        return {"synopsis": "", "genre_style_notes": "", "world": "", "characters": "", "outline": ""}
-
-    heading_map = {
-        "synopsis": ["synopsis", "premise", "logline"],
-        "genre_style_notes": ["genre", "style", "tone", "voice"],
-        "world": ["world", "setting", "lore"],
-        "characters": ["characters", "cast"],
-        "outline": ["outline", "beats", "plot", "structure"],
-    }
+        return dict.fromkeys(STORY_BIBLE_KEYS, "")
 
     lines = t.splitlines()
-    buckets = {k: [] for k in heading_map.keys()}
+    buckets: Dict[str, List[str]] = {k: [] for k in _SB_HEADING_MAP}
     current = None
 
-    def _match_heading(line: str) -> Optional[str]:
-        l = re.sub(r"^[#\-\*\s]+", "", (line or "").strip()).lower()
-        l = re.sub(r"[:\-\s]+$", "", l)
-        for key, aliases in heading_map.items():
-            if any(l == a or l.startswith(a + " ") for a in aliases):
-                return key
-        return None
-
     for line in lines:
-        key = _match_heading(line)
+        key = _match_sb_heading(line)
         if key:
             current = key
             continue
@@ -1786,21 +2220,33 @@ def _sb_sections_from_text_heuristic(text: str) -> Dict[str, str]:
         else:
             buckets["synopsis"].append(line)
 
-    return {k: _normalize_text("\n".join(v)) for k, v in buckets.items()}
+    # lines of normalized text carry no CRs or space runs, so rejoining them can
+    # only reintroduce blank-line runs (a section that appears twice)
+    return {k: _EXTRA_BLANK_LINES_RE.sub("\n\n", "\n".join(v)).strip() for k, v in buckets.items()}
+
+
+_JSON_DECODER = json.JSONDecoder()
 
 
 def _extract_json_object(s: str) -> Optional[Dict[str, Any]]:
+    """
+    First JSON object in a model reply. raw_decode parses exactly one object
+    starting at a "{" and ignores whatever follows (closing ``` fences,
+    trailing prose), so no fence stripping or greedy regex is needed.
+    """
     if not s:
         return None
-    s2 = re.sub(r"^```(?:json)?\s*|\s*```$", "", s.strip(), flags=re.IGNORECASE | re.MULTILINE)
-    m = re.search(r"\{.*\}", s2, flags=re.DOTALL)
-    if not m:
-        return None
-    try:
-        obj = json.loads(m.group(0))
+    i = s.find("{")
+    for _ in range(16):  # a few stray braces in leading prose are fine; don't scan forever
+        if i < 0:
+            return None
+        try:
+            obj, _end = _JSON_DECODER.raw_decode(s, i)
+        except ValueError:
+            i = s.find("{", i + 1)
+            continue
         return obj if isinstance(obj, dict) else None
-    except Exception:
-        return None
+    return None
 
 
 def story_bible_markdown(title: str, sb: Dict[str, str], meta: Dict[str, Any]) -> str:
@@ -1853,8 +2299,9 @@ def make_library_bundle() -> Dict[str, Any]:
     }
 
 
-def _new_pid_like(seed: str) -> str:
-    return hashlib.md5(f"{seed}|{now_ts()}".encode("utf-8")).hexdigest()[:12]
+def _new_pid() -> str:
+    """Fresh 12-hex-char project id (random, so repeated imports in one second can't collide)."""
+    return secrets.token_hex(6)
 
 
 def import_project_bundle(bundle: Dict[str, Any], target_bay: str = "NEW", rename: str = "") -> Optional[str]:
@@ -1864,11 +2311,11 @@ def import_project_bundle(bundle: Dict[str, Any], target_bay: str = "NEW", renam
     if not isinstance(proj, dict):
         return None
 
-    pid = str(proj.get("id") or _new_pid_like("import"))
+    pid = str(proj.get("id") or _new_pid())
     if pid in (st.session_state.projects or {}):
-        pid = _new_pid_like(pid)
+        pid = _new_pid()
 
-    proj = json.loads(json.dumps(proj))
+    proj = _parse_json_bytes(_serialize_payload(proj))  # deep copy
     proj["id"] = pid
     if rename.strip():
         proj["title"] = rename.strip()
@@ -1881,12 +2328,16 @@ def import_project_bundle(bundle: Dict[str, Any], target_bay: str = "NEW", renam
     proj.setdefault("story_bible_id", hashlib.md5(f"sb|{title}|{ts}".encode("utf-8")).hexdigest()[:12])
     proj.setdefault("story_bible_created_ts", ts)
     # story_bible_binding and locks removed: Story Bible is always editable
-    proj.setdefault("voices", default_voice_vault())
-    proj.setdefault("style_banks", default_style_banks())
+    if "voices" not in proj:
+        proj["voices"] = default_voice_vault()
+    if "style_banks" not in proj:
+        proj["style_banks"] = default_style_banks()
     proj.setdefault("story_bible_fingerprint", "")
 
     st.session_state.projects[pid] = proj
     st.session_state.active_project_by_bay[proj.get("bay", "NEW")] = pid
+    _index_project_bay(pid)
+    _touch_revision()
     return pid
 
 
@@ -1908,9 +2359,10 @@ def import_library_bundle(bundle: Dict[str, Any]) -> int:
     if isinstance(w, dict) and w.get("workspace_story_bible_id"):
         cur = st.session_state.sb_workspace or default_story_bible_workspace()
         cur_sb = (cur.get("story_bible", {}) or {})
-        cur_empty = not any((cur_sb.get(k, "") or "").strip() for k in ["synopsis", "genre_style_notes", "world", "characters", "outline"])
+        cur_empty = not any((cur_sb.get(k, "") or "").strip() for k in STORY_BIBLE_KEYS)
         if cur_empty:
             st.session_state.sb_workspace = w
+            _touch_revision()
     return imported
 
 
@@ -1919,39 +2371,78 @@ def import_library_bundle(bundle: Dict[str, Any]) -> int:
 # ============================================================
 CMD_FIND = re.compile(r"^\s*/find\s*:\s*(.+)$", re.IGNORECASE)
 CMD_CREATE = re.compile(r"^\s*/create\s*:\s*(.+)$", re.IGNORECASE)
-CMD_PROMOTE = re.compile(r"^\s*/promote\s*$", re.IGNORECASE)
+CMD_PROMOTE = "/promote"  # bare command: plain (case-insensitive) equality, no regex
+# /find searches these (output label, session key) fields, in this order
+_FIND_TARGETS = (
+    ("DRAFT", "main_text"),
+    ("SYNOPSIS", "synopsis"),
+    ("WORLD", "world"),
+    ("CHARS", "characters"),
+    ("OUTLINE", "outline"),
+)
+_FIND_FIELD_MAX_HITS = 20
+_FIND_MAX_HITS = 30
 
 
 def _run_find(term: str) -> str:
+    """Case-insensitive line search over the draft and Story Bible.
+
+    Several terms can be given as "a | b"; each line is reported once.
+    """
     term = (term or "").strip()
-    if not term:
+    terms = [t for t in (part.strip().lower() for part in term.split("|")) if t]
+    if not terms:
         return "Find: missing search term. Use /find: word"
 
-    def _hits(label: str, text: str) -> List[str]:
-        lines = (text or "").splitlines()
+    # one compiled alternation scans each field once, whatever the term count
+    pat = re.compile("|".join(re.escape(t) for t in sorted(set(terms), key=len, reverse=True)))
+    cache = st.session_state._find_cache
+
+    def _hits(label: str, text: str, limit: int) -> List[str]:
+        cached = cache.get(label)
+        # keyed by the text itself: an unchanged field is usually the same str object,
+        # and a hash match alone could hand back another text's lines
+        if cached is None or not (cached[0] is text or cached[0] == text):
+            lines_lc = text.lower().splitlines()
+            starts = list(accumulate((len(l) + 1 for l in lines_lc), initial=0))
+            cached = cache[label] = (text, lines_lc, "\n".join(lines_lc), starts)
+        _, lines_lc, joined, starts = cached
         out = []
-        for i, line in enumerate(lines, start=1):
-            if term.lower() in (line or "").lower():
-                out.append(f"{label} L{i}: {line.strip()}")
-            if len(out) >= 20:
+        lines = None
+        pos = 0
+        while len(out) < limit:
+            m = pat.search(joined, pos)
+            if m is None:
                 break
+            i = bisect_right(starts, m.start()) - 1
+            end = starts[i] + len(lines_lc[i])
+            # a term holding a newline could match across lines; only in-line hits count
+            if m.end() <= end or pat.search(lines_lc[i]):
+                if lines is None:
+                    lines = text.splitlines()
+                out.append(f"{label} L{i + 1}: {lines[i].strip()}")
+            pos = end + 1
         return out
 
-    hits = []
-    hits += _hits("DRAFT", st.session_state.main_text)
-    hits += _hits("SYNOPSIS", st.session_state.synopsis)
-    hits += _hits("WORLD", st.session_state.world)
-    hits += _hits("CHARS", st.session_state.characters)
-    hits += _hits("OUTLINE", st.session_state.outline)
+    # stop scanning once one hit past the overall cap turns up
+    hits: List[str] = []
+    for label, key in _FIND_TARGETS:
+        text = st.session_state.get(key)
+        if text:  # empty fields: no cache entry, no scan
+            hits += _hits(label, text, min(_FIND_FIELD_MAX_HITS, _FIND_MAX_HITS + 1 - len(hits)))
+            if len(hits) > _FIND_MAX_HITS:
+                break
 
     if not hits:
         return f"Find: no matches for '{term}'."
-    return "\n".join(hits[:30])
+    if len(hits) > _FIND_MAX_HITS:
+        return "\n".join(hits[:_FIND_MAX_HITS]) + f"\n(+ more hits; showing first {_FIND_MAX_HITS})"
+    return "\n".join(hits)
 
 
 def handle_junk_commands() -> None:
     raw = (st.session_state.junk or "").strip()
-    if not raw:
+    if not raw.startswith("/"):
         return
 
     m = CMD_CREATE.match(raw)
@@ -1964,10 +2455,10 @@ def handle_junk_commands() -> None:
         st.session_state.voice_status = f"Created project in NEW: {st.session_state.project_title}"
         st.session_state.last_action = "Create Project"
         st.session_state.junk = ""
-        autosave()
+        autosave(flush=True)
         return
 
-    if CMD_PROMOTE.match(raw):
+    if raw.lower() == CMD_PROMOTE:
         pid = st.session_state.project_id
         bay = st.session_state.active_bay
         nb = next_bay(bay)
@@ -1984,7 +2475,7 @@ def handle_junk_commands() -> None:
         st.session_state.voice_status = f"Promoted → {nb}: {st.session_state.project_title}"
         st.session_state.last_action = f"Promote → {nb}"
         st.session_state.junk = ""
-        autosave()
+        autosave(flush=True)
         return
 
     m = CMD_FIND.match(raw)
@@ -2004,19 +2495,23 @@ handle_junk_commands()
 # ============================================================
 # AI BRIEF + CALL
 # ============================================================
-def _story_bible_text() -> str:
-    sb = []
-    if (st.session_state.synopsis or "").strip():
-        sb.append(f"SYNOPSIS:\n{st.session_state.synopsis.strip()}")
-    if (st.session_state.genre_style_notes or "").strip():
-        sb.append(f"GENRE/STYLE NOTES:\n{st.session_state.genre_style_notes.strip()}")
-    if (st.session_state.world or "").strip():
-        sb.append(f"WORLD:\n{st.session_state.world.strip()}")
-    if (st.session_state.characters or "").strip():
-        sb.append(f"CHARACTERS:\n{st.session_state.characters.strip()}")
-    if (st.session_state.outline or "").strip():
-        sb.append(f"OUTLINE:\n{st.session_state.outline.strip()}")
-    return "\n\n".join(sb).strip() if sb else "— None provided —"
+def _story_bible_text(fields: Optional[Dict[str, Any]] = None) -> str:
+    src = st.session_state if fields is None else fields
+    return format_story_bible(tuple(src.get(k) or "" for k, _ in SB_BRIEF_HEADINGS))
+
+
+# Every session field that can change the assembled brief (besides draft tail + bank epochs)
+_BRIEF_INPUT_KEYS = (
+    "synopsis", "genre_style_notes", "world", "characters", "outline",
+    "vb_style_on", "writing_style", "style_intensity",
+    "vb_genre_on", "genre", "genre_intensity",
+    "vb_trained_on", "trained_voice", "trained_intensity",
+    "vb_match_on", "voice_sample", "match_intensity",
+    "vb_lock_on", "voice_lock_prompt", "lock_intensity",
+    "vb_technical_on", "pov", "tense", "technical_intensity",
+    "ai_intensity",
+)
+_BRIEF_CACHE_MAX = 16
 
 
 def build_partner_brief(action_name: str, lane: str) -> str:
@@ -2024,48 +2519,76 @@ def build_partner_brief(action_name: str, lane: str) -> str:
     ═══════════════════════════════════════════════════════════════
     CORE INTEGRATION HUB - Assembles all Voice Bible controls into
     a unified AI prompt. Used by ALL AI generation functions.
+    Memoized per session on every input, so repeat actions on an
+    unchanged context skip retrieval and assembly.
     ═══════════════════════════════════════════════════════════════
     """
-    story_bible = _story_bible_text()
+    tail = (st.session_state.main_text or "")[-2500:]
+    inputs = tuple(st.session_state.get(k) for k in _BRIEF_INPUT_KEYS)
+    key = (
+        action_name,
+        lane,
+        tail,
+        st.session_state.get("_voice_epoch", 0),
+        st.session_state.get("_style_epoch", 0),
+    ) + inputs
+    cache: "OrderedDict[Tuple[Any, ...], str]" = st.session_state["_brief_cache"]
+    brief = cache.get(key)
+    if brief is not None:
+        cache.move_to_end(key)
+        return brief
+    brief = _assemble_partner_brief(action_name, lane, tail, dict(zip(_BRIEF_INPUT_KEYS, inputs)))
+    cache[key] = brief
+    if len(cache) > _BRIEF_CACHE_MAX:
+        cache.popitem(last=False)
+    return brief
+
+
+def _assemble_partner_brief(action_name: str, lane: str, tail: str, ss: Dict[str, Any]) -> str:
+    """
+    Build the brief from `ss`, the _BRIEF_INPUT_KEYS values build_partner_brief
+    already read for its cache key: a plain dict lookup per field instead of
+    another trip through the session_state proxy.
+    """
+    story_bible = _story_bible_text(ss)
+    # retrieval query for both exemplar banks: the draft's tail, else the synopsis
+    ctx_tail = tail if tail.strip() else (ss["synopsis"] or "")
     vb = []
-    if st.session_state.vb_style_on:
-        vb.append(f"Writing Style: {st.session_state.writing_style} (intensity {st.session_state.style_intensity:.2f})")
-    if st.session_state.vb_genre_on:
-        vb.append(f"Genre Influence: {st.session_state.genre} (intensity {st.session_state.genre_intensity:.2f})")
-    if st.session_state.vb_trained_on and st.session_state.trained_voice and st.session_state.trained_voice != "— None —":
-        vb.append(f"Trained Voice: {st.session_state.trained_voice} (intensity {st.session_state.trained_intensity:.2f})")
-    if st.session_state.vb_match_on and (st.session_state.voice_sample or "").strip():
-        vb.append(f"Match Sample (intensity {st.session_state.match_intensity:.2f}):\n{st.session_state.voice_sample.strip()}")
-    if st.session_state.vb_lock_on and (st.session_state.voice_lock_prompt or "").strip():
-        vb.append(f"VOICE LOCK (strength {st.session_state.lock_intensity:.2f}):\n{st.session_state.voice_lock_prompt.strip()}")
-    if st.session_state.vb_technical_on:
-        vb.append(f"Technical Controls: POV={st.session_state.pov}, Tense={st.session_state.tense} (enforcement {st.session_state.technical_intensity:.2f})")
+    if ss["vb_style_on"]:
+        vb.append(f"Writing Style: {ss['writing_style']} (intensity {ss['style_intensity']:.2f})")
+    if ss["vb_genre_on"]:
+        vb.append(f"Genre Influence: {ss['genre']} (intensity {ss['genre_intensity']:.2f})")
+    if ss["vb_trained_on"] and ss["trained_voice"] and ss["trained_voice"] != "— None —":
+        vb.append(f"Trained Voice: {ss['trained_voice']} (intensity {ss['trained_intensity']:.2f})")
+    if ss["vb_match_on"] and (ss["voice_sample"] or "").strip():
+        vb.append(f"Match Sample (intensity {ss['match_intensity']:.2f}):\n{ss['voice_sample'].strip()}")
+    if ss["vb_lock_on"] and (ss["voice_lock_prompt"] or "").strip():
+        vb.append(f"VOICE LOCK (strength {ss['lock_intensity']:.2f}):\n{ss['voice_lock_prompt'].strip()}")
+    if ss["vb_technical_on"]:
+        vb.append(f"Technical Controls: POV={ss['pov']}, Tense={ss['tense']} (enforcement {ss['technical_intensity']:.2f})")
     voice_controls = "\n\n".join(vb).strip() if vb else "— None enabled —"
 
     # Engine Style (trainable banks) → Semantic retrieval of trained samples
-    style_name = (st.session_state.writing_style or "").strip().upper()
+    style_name = (ss["writing_style"] or "").strip().upper()
     style_directive = ""
     style_exemplars: List[str] = []
-    if st.session_state.vb_style_on and style_name in ENGINE_STYLES:
-        style_directive = engine_style_directive(style_name, float(st.session_state.style_intensity), lane)
-        ctx2 = (st.session_state.main_text or "")[-2500:]
-        q2 = ctx2 if ctx2.strip() else (st.session_state.synopsis or "")
-        k = 1 + int(max(0.0, min(1.0, float(st.session_state.style_intensity))) * 2.0)
-        style_exemplars = retrieve_style_exemplars(style_name, lane, q2, k=k)  # ← INTELLIGENT RETRIEVAL
+    if ss["vb_style_on"] and style_name in ENGINE_STYLES:
+        style_x = float(ss["style_intensity"])
+        style_directive = engine_style_directive(style_name, style_x, lane)
+        k = 1 + int(max(0.0, min(1.0, style_x)) * 2.0)
+        style_exemplars = retrieve_style_exemplars(style_name, lane, ctx_tail, k=k)  # ← INTELLIGENT RETRIEVAL
 
     # Trained Voice → Vector-based semantic matching
     exemplars: List[str] = []
-    tv = st.session_state.trained_voice
-    if st.session_state.vb_trained_on and tv and tv != "— None —":
-        ctx = (st.session_state.main_text or "")[-2500:]
-        query = ctx if ctx.strip() else st.session_state.synopsis
-        exemplars = retrieve_mixed_exemplars(tv, lane, query)  # ← ADAPTIVE RETRIEVAL
+    tv = ss["trained_voice"]
+    if ss["vb_trained_on"] and tv and tv != "— None —":
+        exemplars = retrieve_mixed_exemplars(tv, lane, ctx_tail)  # ← ADAPTIVE RETRIEVAL
     ex_block = "\n\n---\n\n".join(exemplars) if exemplars else "— None —"
     style_ex_block = "\n\n---\n\n".join(style_exemplars) if style_exemplars else "— None —"
 
-    ai_x = float(st.session_state.ai_intensity)
-    return f"""
-YOU ARE OLIVETTI: the author's personal writing and editing partner.
+    ai_x = float(ss["ai_intensity"])
+    # starts and ends on literal text, so no .strip() copy of the whole brief
+    return f"""YOU ARE OLIVETTI: the author's personal writing and editing partner.
 Professional output only. No UI talk. No process talk.
 
 STORY BIBLE IS CANON + IDEA BANK.
@@ -2092,29 +2615,37 @@ TRAINED EXEMPLARS (mimic patterns, not content):
 STORY BIBLE:
 {story_bible}
 
-ACTION: {action_name}
-""".strip()
+ACTION: {action_name}"""
 
 
-def call_openai(system_brief: str, user_task: str, text: str) -> str:
-    """
-    ═══════════════════════════════════════════════════════════════
-    UNIFIED AI GATEWAY - Single entry point for ALL AI generation.
-    Applies AI Intensity → Temperature conversion automatically.
-    ═══════════════════════════════════════════════════════════════
-    """
-    key = require_openai_key()
+@st.cache_resource(show_spinner=False)
+def _openai_client(key: str):
+    """One client (and its keep-alive connection pool) per API key, reused across calls and reruns."""
     try:
         from openai import OpenAI
     except Exception as e:
         raise RuntimeError("OpenAI SDK not installed. Add to requirements.txt: openai") from e
 
     try:
-        client = OpenAI(api_key=key, timeout=60)
+        return OpenAI(api_key=key, timeout=60)
     except TypeError:
-        client = OpenAI(api_key=key)
+        return OpenAI(api_key=key)
+
+
+STREAM_REFRESH_S = 0.08  # min seconds between live-preview repaints while streaming
+
 
-    resp = client.chat.completions.create(
+def call_openai(system_brief: str, user_task: str, text: str, stream_to: Any = None) -> str:
+    """
+    ═══════════════════════════════════════════════════════════════
+    UNIFIED AI GATEWAY - Single entry point for ALL AI generation.
+    Applies AI Intensity → Temperature conversion automatically.
+    ═══════════════════════════════════════════════════════════════
+    With `stream_to` (an st.empty() placeholder) the completion is streamed
+    and painted into it as it arrives; the full text is still returned.
+    """
+    client = _openai_client(require_openai_key())
+    kwargs = dict(
         model=OPENAI_MODEL,
         messages=[
             {"role": "system", "content": system_brief},
@@ -2122,25 +2653,73 @@ def call_openai(system_brief: str, user_task: str, text: str) -> str:
         ],
         temperature=temperature_from_intensity(st.session_state.ai_intensity),  # ← AI INTENSITY → TEMPERATURE
     )
-    result = (resp.choices[0].message.content or "").strip()
+    if stream_to is None:
+        resp = client.chat.completions.create(**kwargs)
+        result = (resp.choices[0].message.content or "").strip()
+    else:
+        parts: List[str] = []
+        painted = 0.0
+        for chunk in client.chat.completions.create(stream=True, **kwargs):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            parts.append(delta)
+            now = time.monotonic()
+            if now - painted >= STREAM_REFRESH_S:
+                stream_to.markdown("".join(parts))
+                painted = now
+        result = "".join(parts).strip()
+        if result:
+            stream_to.markdown(result)  # final paint; the throttle may have skipped the tail
     logger.info(f"call_openai returned {len(result)} chars: {result[:100] if result else 'EMPTY'}")
     return result
 
 
+# One pass over the text. Alternatives are ordered so that, at any position,
+# the rule that would have won in the old sequential passes matches first:
+# a dash or a space-before-punctuation run swallows the whole whitespace run,
+# a blank-line run absorbs the trailing blanks on its lines, an ellipsis
+# spans the whitespace that would have been dropped between its dots, and
+# adjacent "--" pairs are emitted as one group so no double space is left
+# behind. Every branch starts with punctuation, a dash, or whitespace
+# followed by one of those, so the leading lookahead lets the scanner skip
+# words and single spaces without trying every branch.
+_CLEANUP_RE = re.compile(
+    r"(?=[.,;:!?-]|\s[\s.,;:!?-])(?:"
+    r"(?P<dash>\s*--(?:\s*--)*\s*)"
+    r"|(?P<sp>\s+(?=[,.;:!?]))"
+    r"|(?P<nl>(?:[ \t]*\n){4,})"
+    r"|(?P<tr>[ \t]+\n)"
+    r"|(?P<ellglue>\.(?:\s*\.){2}(?=[A-Za-z0-9]))"
+    r"|(?P<ell>\.(?:\s*\.){2})"
+    r"|(?P<glue>[,.;:!?](?=[A-Za-z0-9]))"
+    r"|(?P<ms>[ \t]{2,})"
+    r")"
+)
+_CLEANUP_REPL = {"sp": "", "nl": "\n\n\n", "tr": "\n", "ellglue": "… ", "ell": "…", "ms": " "}
+
+
+def _cleanup_sub(m: "re.Match[str]") -> str:
+    kind = m.lastgroup
+    if kind == "glue":
+        return m.group() + " "
+    if kind == "dash":
+        return " " + " ".join("—" * m.group().count("--")) + " "
+    return _CLEANUP_REPL[kind]
+
+
+# Pure text -> text, and Spell/Grammar/Rewrite clicks often repeat on an
+# unchanged draft. Each click is its own rerun, which would start a
+# script-level lru_cache from empty, so the memo is Streamlit's own.
+@st.cache_data(max_entries=64, show_spinner=False)
 def local_cleanup(text: str) -> str:
     t = (text or "")
     t = t.replace("\r\n", "\n").replace("\r", "\n")
-    t = re.sub(r"[ \t]+\n", "\n", t)
-    t = re.sub(r"\n{4,}", "\n\n\n", t)
-    t = re.sub(r"\s+([,.;:!?])", r"\1", t)
-    t = re.sub(r"([,.;:!?])([A-Za-z0-9])", r"\1 \2", t)
-    t = re.sub(r"\.\.\.", "…", t)
-    t = re.sub(r"\s*--\s*", " — ", t)
-    t = re.sub(r"[ \t]{2,}", " ", t)
+    t = _CLEANUP_RE.sub(_cleanup_sub, t)
     return t.strip()
 
 
-def sb_breakdown_ai(text: str) -> Dict[str, str]:
+def sb_breakdown_ai(text: str, normalized: bool = False) -> Dict[str, str]:
     prompt = """Break the provided source document into these Story Bible sections.
 Return STRICT JSON with these exact keys:
 synopsis, genre_style_notes, world, characters, outline
@@ -2166,7 +2745,7 @@ Rules:
             "outline": _normalize_text(str(obj.get("outline", ""))),
         }
     except Exception:
-        return _sb_sections_from_text_heuristic(text)
+        return _sb_sections_from_text_heuristic(text, normalized)
 
 
 def _merge_section(existing: str, incoming: str, mode: str) -> str:
@@ -2384,6 +2963,21 @@ EXISTING CONTEXT:
 # ============================================================
 # ACTIONS (queued for Streamlit safety)
 # ============================================================
+_LAST_WORD_RE = re.compile(r"([A-Za-z']{3,})\W*$")
+_SENTENCE_BREAK_RE = re.compile(r"[.!?]\s")
+
+
+def _last_sentence(text: str) -> str:
+    """
+    The final sentence of `text`: whatever follows the last [.!?] +
+    whitespace break, stripped. Only about one sentence is scanned instead
+    of splitting the whole draft into a list to keep its last item.
+    """
+    t = text.strip()
+    m = _last_match(_SENTENCE_BREAK_RE, t)
+    return t[m.end():].strip() if m else t
+
+
 def partner_action(action: str) -> None:
     """
     ═══════════════════════════════════════════════════════════════
@@ -2402,6 +2996,7 @@ def partner_action(action: str) -> None:
     brief = build_partner_brief(action, lane=lane)  # ← UNIFIED BRIEF with ALL Voice Bible controls
     use_ai = has_openai_key()
     logger.info(f"use_ai = {use_ai}, text length = {len(text)}, is_selection = {is_selection}")
+    live = st.empty() if use_ai else None  # streamed output lands here until the rerun
 
     def show_preview(result: str, action_name: str) -> None:
         """Show AI output in preview window for user review"""
@@ -2461,7 +3056,7 @@ def partner_action(action: str) -> None:
                     "MANDATORY: incorporate at least 2 Story Bible specifics. "
                     "No recap. No planning. Just prose."
                 )
-                out = call_openai(brief, task, text if text.strip() else "Start the opening.")
+                out = call_openai(brief, task, text if text.strip() else "Start the opening.", stream_to=live)
                 show_preview(out, "Write")
             else:
                 st.session_state.tool_output = "Write requires OPENAI_API_KEY to be configured."
@@ -2472,7 +3067,7 @@ def partner_action(action: str) -> None:
         if action == "Rewrite":
             if use_ai:
                 task = f"Rewrite for professional quality in lane ({lane}). Preserve meaning and canon. Return full revised text."
-                out = call_openai(brief, task, text)
+                out = call_openai(brief, task, text, stream_to=live)
                 show_preview(out, "Rewrite")
             else:
                 show_preview(local_cleanup(text), "Rewrite")
@@ -2481,7 +3076,7 @@ def partner_action(action: str) -> None:
         if action == "Expand":
             if use_ai:
                 task = f"Expand with meaningful depth in lane ({lane}). No padding. Preserve canon. Return full revised text."
-                out = call_openai(brief, task, text)
+                out = call_openai(brief, task, text, stream_to=live)
                 show_preview(out, "Expand")
             else:
                 st.session_state.tool_output = "Expand requires OPENAI_API_KEY to be configured."
@@ -2492,7 +3087,7 @@ def partner_action(action: str) -> None:
         if action == "Rephrase":
             if use_ai:
                 task = f"Replace the final sentence with a stronger one (same meaning) in lane ({lane}). Return full text."
-                out = call_openai(brief, task, text)
+                out = call_openai(brief, task, text, stream_to=live)
                 show_preview(out, "Rephrase")
             else:
                 st.session_state.tool_output = "Rephrase requires OPENAI_API_KEY to be configured."
@@ -2503,7 +3098,7 @@ def partner_action(action: str) -> None:
         if action == "Describe":
             if use_ai:
                 task = f"Add vivid controlled description in lane ({lane}). Preserve pace and canon. Return full revised text."
-                out = call_openai(brief, task, text)
+                out = call_openai(brief, task, text, stream_to=live)
                 show_preview(out, "Describe")
             else:
                 st.session_state.tool_output = "Describe requires OPENAI_API_KEY to be configured."
@@ -2515,7 +3110,7 @@ def partner_action(action: str) -> None:
             cleaned = local_cleanup(text)
             if use_ai:
                 task = "Copyedit spelling/grammar/punctuation. Preserve voice. Return full revised text."
-                out = call_openai(brief, task, cleaned)
+                out = call_openai(brief, task, cleaned, stream_to=live)
                 show_preview(out if out else cleaned, action)
             else:
                 show_preview(cleaned, action)
@@ -2524,7 +3119,7 @@ def partner_action(action: str) -> None:
         if action == "Synonym":
             # Tool output only (does not change draft)
             last = ""
-            m = re.search(r"([A-Za-z']{3,})\W*$", text.strip())
+            m = _LAST_WORD_RE.search(text.strip())
             if m:
                 last = m.group(1)
             if not last:
@@ -2538,7 +3133,7 @@ def partner_action(action: str) -> None:
                     "Group them by nuance (formal, punchy, poetic, archaic, etc). "
                     "No filler." 
                 )
-                out = call_openai(brief, task, text)
+                out = call_openai(brief, task, text, stream_to=live)
                 st.session_state.tool_output = _clamp_text(out)
             else:
                 st.session_state.tool_output = f"Synonym requires OPENAI_API_KEY (target word: {last})."
@@ -2549,10 +3144,7 @@ def partner_action(action: str) -> None:
 
         if action == "Sentence":
             # Tool output only
-            last_sentence = ""
-            sentences = re.split(r"(?<=[.!?])\s+", text.strip())
-            if sentences:
-                last_sentence = sentences[-1].strip()
+            last_sentence = _last_sentence(text)
             if not last_sentence:
                 st.session_state.tool_output = "Sentence: couldn't detect a final sentence."
                 st.session_state.voice_status = "Sentence: no target"
@@ -2563,7 +3155,7 @@ def partner_action(action: str) -> None:
                     "Provide 8 alternative rewrites of the final sentence. "
                     "Keep meaning. Vary rhythm and diction. Return as a numbered list."
                 )
-                out = call_openai(brief, task, text)
+                out = call_openai(brief, task, text, stream_to=live)
                 st.session_state.tool_output = _clamp_text(out)
             else:
                 st.session_state.tool_output = "Sentence requires OPENAI_API_KEY."
@@ -2594,12 +3186,33 @@ def partner_action(action: str) -> None:
             st.session_state.voice_status = f"Engine: {msg[:50]}"
             st.session_state.tool_output = _clamp_text(f"ERROR:\n{msg}\n\nFull trace:\n{traceback.format_exc()}")
         autosave()
+    finally:
+        if live is not None:
+            live.empty()
 
 
 def queue_action(action: str) -> None:
     st.session_state.pending_action = action
 
 
+# Writing-desk buttons: (label, queued action, widget key, help). All respect
+# Voice Bible + AI Intensity; secondary-row clicks rerun immediately.
+_DESK_PRIMARY = (
+    ("Write", "Write", "btn_write", "Continue writing (Voice Bible controlled)"),
+    ("Rewrite", "Rewrite", "btn_rewrite", "Rewrite for quality (Voice Bible controlled)"),
+    ("Expand", "Expand", "btn_expand", "Add depth (Voice Bible controlled)"),
+    ("Rephrase", "Rephrase", "btn_rephrase", "Rephrase last sentence (Voice Bible controlled)"),
+    ("Describe", "Describe", "btn_describe", "Add description (Voice Bible controlled)"),
+)
+_DESK_SECONDARY = (
+    ("Spell", "Spell", "btn_spell", "Fix spelling/grammar (Voice Bible controlled)"),
+    ("Grammar", "Grammar", "btn_grammar", "Copyedit grammar (Voice Bible controlled)"),
+    ("Find", "__FIND_HINT__", "btn_find", "Search tool (see Junk Drawer)"),
+    ("Synonym", "Synonym", "btn_synonym", "Get synonyms for last word (Voice Bible aware)"),
+    ("Sentence", "Sentence", "btn_sentence", "Rewrite last sentence options (Voice Bible aware)"),
+)
+
+
 def run_pending_action() -> None:
     action = st.session_state.get("pending_action")
     if not action:
@@ -2681,30 +3294,11 @@ with left:
     st.subheader("📖 Story Bible")
 
     bay = st.session_state.active_bay
-    bay_projects = list_projects_in_bay(bay)
-
-    # Build a stable selector with unique labels (handles duplicate titles)
-    if bay == "NEW":
-        items: List[Tuple[Optional[str], str]] = [(None, "— (Story Bible workspace) —")] + [(pid, title) for pid, title in bay_projects]
-    else:
-        items = [(None, "— (none) —")] + [(pid, title) for pid, title in bay_projects]
-
-    # Disambiguate duplicate titles
-    seen: Dict[str, int] = {}
-    labels: List[str] = []
-    ids: List[Optional[str]] = []
-    for pid, title in items:
-        base = title
-        seen[base] = seen.get(base, 0) + 1
-        label = base if seen[base] == 1 else f"{base}  ·  {str(pid)[-4:]}"
-        labels.append(label)
-        ids.append(pid)
-
-    current_pid = st.session_state.project_id if (st.session_state.project_id in ids) else None
-    current_idx = ids.index(current_pid) if current_pid in ids else 0
+    labels, ids, id_to_idx, label_to_idx = bay_selector_options(bay)
+    current_idx = id_to_idx.get(st.session_state.project_id, 0)
 
     sel = st.selectbox("Current Bay Project", labels, index=current_idx, key="bay_project_selector")
-    sel_pid = ids[labels.index(sel)] if sel in labels else None
+    sel_pid = ids[label_to_idx[sel]] if sel in label_to_idx else None
 
     if sel_pid:
         p = st.session_state.projects.get(sel_pid, {}) or {}
@@ -2745,11 +3339,12 @@ with left:
                 st.session_state.outline = ""
                 st.session_state.voice_sample = ""
                 set_ai_intensity(0.75)
-                st.session_state.voices = rebuild_vectors_in_voice_vault(default_voice_vault())
+                st.session_state.voices = empty_voice_vault()
                 st.session_state.voices_seeded = True
+                _mark_voices_changed()
                 st.session_state.voice_status = f"{bay}: (empty)"
         st.session_state.last_action = "Select Context"
-        autosave()
+        autosave(flush=True)
 
     # Hard lock: Story Bible edits are locked per-project unless explicitly unlocked
     is_project = bool(st.session_state.project_id)
@@ -2803,7 +3398,7 @@ with left:
             load_project_into_session(pid)
             st.session_state.voice_status = f"Created in NEW: {st.session_state.project_title}"
             st.session_state.last_action = "Create Project"
-            autosave()
+            autosave(flush=True)
             st.rerun()
 
         if in_workspace_mode() and action_cols[1].button("New Story Bible (fresh ID)", key="new_workspace_bible_btn"):
@@ -2821,7 +3416,7 @@ with left:
                 switch_bay("ROUGH")
                 st.session_state.voice_status = f"Promoted → ROUGH: {st.session_state.project_title}"
                 st.session_state.last_action = "Promote → ROUGH"
-                autosave()
+                autosave(flush=True)
                 st.rerun()
     elif bay in ("ROUGH", "EDIT"):
         nb = next_bay(bay)
@@ -2833,7 +3428,7 @@ with left:
                 switch_bay(nb)
                 st.session_state.voice_status = f"Promoted → {nb}: {st.session_state.project_title}"
                 st.session_state.last_action = f"Promote → {nb}"
-                autosave()
+                autosave(flush=True)
                 st.rerun()
 
     # Import / Export hub (restored)
@@ -2855,8 +3450,12 @@ with left:
             )
 
             if st.button("Run Import", key="io_run_import"):
-                src_file, name = _read_uploaded_text(up)
-                src = _normalize_text(paste if (paste or "").strip() else src_file)
+                # pasted text wins, so only parse the upload (DOCX can be slow) when it's the source
+                if (paste or "").strip():
+                    src, name = _normalize_text(paste), ""
+                else:
+                    src_file, name = _read_uploaded_text(up)
+                    src = _normalize_text(src_file)
                 if not src.strip():
                     st.session_state.tool_output = "Import: no text provided (or file too large)."
                     st.session_state.voice_status = "Import blocked"
@@ -2875,7 +3474,8 @@ with left:
                         st.session_state.voice_status = "Import blocked (locked)"
                         autosave()
                     else:
-                        sections = sb_breakdown_ai(src) if use_ai else _sb_sections_from_text_heuristic(src)
+                        # src is already normalized above; don't scan it again
+                        sections = sb_breakdown_ai(src, True) if use_ai else _sb_sections_from_text_heuristic(src, True)
                         st.session_state.synopsis = _merge_section(st.session_state.synopsis, sections.get("synopsis", ""), merge_mode)
                         st.session_state.genre_style_notes = _merge_section(
                             st.session_state.genre_style_notes, sections.get("genre_style_notes", ""), merge_mode
@@ -3140,14 +3740,15 @@ with left:
         with tab_bundle:
             st.caption("Bundle exports are merge-safe (imports never wipe your library).")
             if st.session_state.project_id:
-                pj = json.dumps(make_project_bundle(st.session_state.project_id), ensure_ascii=False, indent=2)
+                # compact bytes: these are rebuilt on every rerun the tab renders
+                pj = _serialize_payload(make_project_bundle(st.session_state.project_id))
                 st.download_button(
                     "Download Project Bundle (.json)",
                     data=pj,
                     file_name=f"{_safe_filename(st.session_state.project_title,'project')}_bundle.json",
                     mime="application/json",
                 )
-            lib = json.dumps(make_library_bundle(), ensure_ascii=False, indent=2)
+            lib = _serialize_payload(make_library_bundle())
             st.download_button("Download Full Library (.json)", data=lib, file_name="olivetti_library_bundle.json", mime="application/json")
 
             st.divider()
@@ -3161,13 +3762,16 @@ with left:
                     st.session_state.tool_output = "Import bundle: upload a .json file first."
                     autosave()
                 else:
-                    raw = upb.getvalue()
-                    if raw is not None and len(raw) > MAX_UPLOAD_BYTES:
+                    # size from the upload's metadata; the buffer is only touched if it passes
+                    size = getattr(upb, "size", None)
+                    too_big = size is not None and size > MAX_UPLOAD_BYTES
+                    raw = None if too_big else upb.getvalue()
+                    if too_big or (raw is not None and len(raw) > MAX_UPLOAD_BYTES):
                         st.session_state.tool_output = "Import bundle: file too large."
                         autosave()
                     else:
                         try:
-                            obj = json.loads((raw or b"").decode("utf-8"))
+                            obj = _parse_json_bytes(raw or b"")
                         except Exception:
                             obj = None
                         if isinstance(obj, dict) and obj.get("projects"):
@@ -3194,7 +3798,10 @@ with left:
                             st.session_state.tool_output = "Import bundle: bundle type not recognized."
                             autosave()
 
-    # Junk Drawer + Story Bible sections (labels hidden safely)
+    # Junk Drawer + Story Bible sections (labels hidden safely).
+    # The text areas stay rendered even when their expander is collapsed: their
+    # keys are widget-owned, and Streamlit drops unrendered widget state.
+    can_generate_sb = not sb_locked and has_openai_key()  # st.secrets lookup once, not per section
     with st.expander("🗃 Junk Drawer"):
         st.text_area(
             "Junk Drawer",
@@ -3202,13 +3809,13 @@ with left:
             height=80,
             on_change=autosave,
             label_visibility="collapsed",
-            help="Commands: /create: Title  |  /promote  |  /find: term",
+            help="Commands: /create: Title  |  /promote  |  /find: term (several: a | b)",
         )
         st.text_area("Tool Output", value=st.session_state.tool_output, height=140, disabled=True)
 
     with st.expander("📝 Synopsis"):
         st.text_area("Synopsis", key="synopsis", height=100, on_change=autosave, label_visibility="collapsed", disabled=sb_locked)
-        if not sb_locked and has_openai_key():
+        if can_generate_sb:
             if st.button("✨ Generate Synopsis", key="gen_synopsis"):
                 generate_story_bible_section("Synopsis")
                 st.rerun()
@@ -3222,14 +3829,14 @@ with left:
             label_visibility="collapsed",
             disabled=sb_locked,
         )
-        if not sb_locked and has_openai_key():
+        if can_generate_sb:
             if st.button("✨ Generate Genre/Style", key="gen_genre"):
                 generate_story_bible_section("Genre/Style")
                 st.rerun()
 
     with st.expander("🌍 World Elements"):
         st.text_area("World", key="world", height=100, on_change=autosave, label_visibility="collapsed", disabled=sb_locked)
-        if not sb_locked and has_openai_key():
+        if can_generate_sb:
             if st.button("✨ Generate World", key="gen_world"):
                 generate_story_bible_section("World")
                 st.rerun()
@@ -3243,14 +3850,14 @@ with left:
             label_visibility="collapsed",
             disabled=sb_locked,
         )
-        if not sb_locked and has_openai_key():
+        if can_generate_sb:
             if st.button("✨ Generate Characters", key="gen_characters"):
                 generate_story_bible_section("Characters")
                 st.rerun()
 
     with st.expander("🧱 Outline"):
         st.text_area("Outline", key="outline", height=160, on_change=autosave, label_visibility="collapsed", disabled=sb_locked)
-        if not sb_locked and has_openai_key():
+        if can_generate_sb:
             if st.button("✨ Generate Outline", key="gen_outline"):
                 generate_story_bible_section("Outline")
                 st.rerun()
@@ -3274,9 +3881,9 @@ with center:
         if st.button("🔍 Check", key="btn_check_canon", disabled=not st.session_state.canon_guardian_on, use_container_width=True):
             text = (st.session_state.main_text or "").strip()
             if text:
-                st.session_state.canon_issues = analyze_canon_conformity(text)
-                error_count = sum(1 for i in st.session_state.canon_issues if i['severity'] == 'error')
-                warn_count = sum(1 for i in st.session_state.canon_issues if i['severity'] == 'warning')
+                issues = analyze_canon_conformity(text)
+                st.session_state.canon_issues = issues
+                error_count, warn_count = _count_canon_severities(issues)
                 st.session_state.ui_notice = f"📖 Found {error_count} error(s), {warn_count} warning(s)"
             else:
                 st.session_state.ui_notice = "⚠️ No text to check"
@@ -3288,20 +3895,22 @@ with center:
         if st.button("🔄 Analyze", key="btn_analyze_heatmap", disabled=not st.session_state.show_voice_heatmap, use_container_width=True):
             text = (st.session_state.main_text or "").strip()
             if text:
-                st.session_state.voice_heatmap_data = analyze_voice_conformity(text)
-                st.session_state.ui_notice = f"✅ Analyzed {len(st.session_state.voice_heatmap_data)} paragraph(s)"
+                heatmap = analyze_voice_conformity(text)
+                st.session_state.voice_heatmap_data = heatmap
+                st.session_state.ui_notice = f"✅ Analyzed {len(heatmap)} paragraph(s)"
             else:
                 st.session_state.ui_notice = "⚠️ No text to analyze"
                 st.session_state.voice_heatmap_data = []
     
     # Show color-coded text view when heatmap is enabled
-    if st.session_state.show_voice_heatmap and st.session_state.voice_heatmap_data:
+    heatmap = st.session_state.voice_heatmap_data if st.session_state.show_voice_heatmap else None
+    if heatmap:
         st.caption("📊 **Live Heatmap View** (Green = On target, Yellow = Minor issues, Red = Major deviation)")
         
         # Build colored HTML view
         html_parts = ['<div style="background-color: #1e1e1e; padding: 15px; border-radius: 5px; font-family: monospace; line-height: 1.8; max-height: 650px; overflow-y: auto;">']
         
-        for para_data in st.session_state.voice_heatmap_data:
+        for para_data in heatmap:
             score = para_data["score"]
             # Determine color based on score
             if score >= 85:
@@ -3331,14 +3940,14 @@ with center:
         
         st.caption("⚠️ Edit in text area below, then click 'Analyze' to update heatmap")
     
-    # Display Canon Guardian issues if enabled
-    if st.session_state.canon_guardian_on and st.session_state.canon_issues:
-        error_count = sum(1 for i in st.session_state.canon_issues if i['severity'] == 'error')
-        warn_count = sum(1 for i in st.session_state.canon_issues if i['severity'] == 'warning')
+    # Display Canon Guardian issues if enabled (one session read, one counting pass)
+    issues = st.session_state.canon_issues if st.session_state.canon_guardian_on else None
+    if issues:
+        error_count, warn_count = _count_canon_severities(issues)
         
         st.warning(f"📖 **Canon Guardian**: {error_count} error(s), {warn_count} warning(s) detected")
         
-        for idx, issue in enumerate(st.session_state.canon_issues[:5]):  # Show top 5
+        for idx, issue in enumerate(issues[:5]):  # Show top 5
             severity_icon = "🔴" if issue['severity'] == 'error' else "🟡"
             confidence_color = "#dc3545" if issue['severity'] == 'error' else "#ffc107"
             
@@ -3373,8 +3982,8 @@ with center:
                         elif option == "Update World":
                             st.session_state.ui_notice = "💡 Navigate to Story Bible → World to update"
         
-        if len(st.session_state.canon_issues) > 5:
-            st.caption(f"... and {len(st.session_state.canon_issues) - 5} more issues")
+        if len(issues) > 5:
+            st.caption(f"... and {len(issues) - 5} more issues")
     
     # Text area for editing (always shown)
 
@@ -3454,36 +4063,15 @@ with center:
         if st.session_state.selection_text.strip():
             accept_cols[2].info("💡 Copy the preview text and paste it back into your draft where you want it.")
 
-    # Primary Actions (all respect Voice Bible + AI Intensity)
-    b1 = st.columns(5)
-    if b1[0].button("Write", key="btn_write", help="Continue writing (Voice Bible controlled)"):
-        queue_action("Write")
-    if b1[1].button("Rewrite", key="btn_rewrite", help="Rewrite for quality (Voice Bible controlled)"):
-        queue_action("Rewrite")
-    if b1[2].button("Expand", key="btn_expand", help="Add depth (Voice Bible controlled)"):
-        queue_action("Expand")
-    if b1[3].button("Rephrase", key="btn_rephrase", help="Rephrase last sentence (Voice Bible controlled)"):
-        queue_action("Rephrase")
-    if b1[4].button("Describe", key="btn_describe", help="Add description (Voice Bible controlled)"):
-        queue_action("Describe")
-
-    # Secondary Actions
-    b2 = st.columns(5)
-    if b2[0].button("Spell", key="btn_spell", help="Fix spelling/grammar (Voice Bible controlled)"):
-        queue_action("Spell")
-        st.rerun()
-    if b2[1].button("Grammar", key="btn_grammar", help="Copyedit grammar (Voice Bible controlled)"):
-        queue_action("Grammar")
-        st.rerun()
-    if b2[2].button("Find", key="btn_find", help="Search tool (see Junk Drawer)"):
-        queue_action("__FIND_HINT__")
-        st.rerun()
-    if b2[3].button("Synonym", key="btn_synonym", help="Get synonyms for last word (Voice Bible aware)"):
-        queue_action("Synonym")
-        st.rerun()
-    if b2[4].button("Sentence", key="btn_sentence", help="Rewrite last sentence options (Voice Bible aware)"):
-        queue_action("Sentence")
-        st.rerun()
+    # Primary over secondary actions: one 5-column grid, one layout block per rerun.
+    for col, (p_label, p_action, p_key, p_help), (s_label, s_action, s_key, s_help) in zip(
+        st.columns(5), _DESK_PRIMARY, _DESK_SECONDARY
+    ):
+        if col.button(p_label, key=p_key, help=p_help):
+            queue_action(p_action)
+        if col.button(s_label, key=s_key, help=s_help):
+            queue_action(s_action)
+            st.rerun()
 
 
 # ============================================================
@@ -3555,9 +4143,9 @@ with right:
         )
         split_mode = s_cols[2].selectbox(
             "Split (sample granularity)",
-            ["Paragraphs", "Whole"],
+            ["Paragraphs", "Sentences", "Whole"],
             key="style_train_split",
-            help="Paragraphs = multiple samples, Whole = single sample"
+            help="Paragraphs = multiple samples, Sentences = runs of whole sentences (~240–1200 chars) regardless of paragraph breaks, Whole = single sample"
         )
         bank = (st.session_state.get("style_banks") or {}).get(st_style, {})
         lanes = bank.get("lanes") or {}
@@ -3582,8 +4170,11 @@ with right:
         )
         c1, c2, c3 = st.columns([1, 1, 1])
         if c1.button("Add Samples", key="style_train_add", use_container_width=True):
-            ftxt, fname = _read_uploaded_text(up)
-            src = _normalize_text((paste or "").strip() if (paste or "").strip() else ftxt)
+            if (paste or "").strip():
+                src, fname = _normalize_text(paste), ""
+            else:
+                ftxt, fname = _read_uploaded_text(up)
+                src = _normalize_text(ftxt)
             if not src.strip():
                 st.session_state.tool_output = "Style Trainer: no text provided (or file too large)."
                 st.session_state.voice_status = "Style Trainer blocked"
@@ -3660,6 +4251,7 @@ with right:
         trained_options = voice_names_for_selector()
         if st.session_state.trained_voice not in trained_options:
             st.session_state.trained_voice = "— None —"
+            autosave()
         st.selectbox(
             "Trained Voice (from Voice Vault)",
             trained_options,
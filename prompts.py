@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Tuple
+
 VOICE_LEARN_SCHEMA = """
 Return STRICT JSON only (no markdown, no commentary) with keys:
 style_notes: string
@@ -23,3 +26,44 @@ TASK: Learn the author's writing voice from the sample.
 SAMPLE (author text):
 {sample_text}
 """.strip()
+
+ENGINE_STYLE_GUIDE = {
+    "NARRATIVE": "Narrative clarity, clean cause→effect, confident pacing. Prioritize story logic and readability.",
+    "DESCRIPTIVE": "Sensory precision, spatial clarity, vivid concrete nouns, controlled detail density (no purple bloat).",
+    "EMOTIONAL": "Interior depth, subtext, emotional specificity. Show the feeling through behavior, sensation, and thought.",
+    "LYRICAL": "Rhythm, musical syntax, image-forward language, elegant metaphor with restraint. Make prose sing without obscuring meaning.",
+}
+
+# one modifier per intensity band (subtle / medium / high)
+ENGINE_STYLE_MODS = (
+    "Keep it subtle and controlled. Minimal overt stylization.",
+    "Medium stylization. Let the style clearly shape diction and cadence.",
+    "High stylization. Strong stylistic fingerprint, but still professional and coherent.",
+)
+
+# memoized here rather than in app.py: an imported module outlives Streamlit reruns
+@lru_cache(maxsize=128)
+def make_engine_style_directive(style: str, band: int, lane: str) -> str:
+    base = ENGINE_STYLE_GUIDE.get(style, "")
+    return f"{base}\\nLane: {lane}\\n{ENGINE_STYLE_MODS[band]}"
+
+# (session key, brief heading) for each Story Bible section, in brief order
+SB_BRIEF_HEADINGS = (
+    ("synopsis", "SYNOPSIS"),
+    ("genre_style_notes", "GENRE/STYLE NOTES"),
+    ("world", "WORLD"),
+    ("characters", "CHARACTERS"),
+    ("outline", "OUTLINE"),
+)
+
+# Canon changes far less often than the draft tail that misses the brief
+# cache, so the assembled block is memoized on the five section strings
+# (here, where the cache outlives Streamlit reruns).
+@lru_cache(maxsize=16)
+def format_story_bible(sections: Tuple[str, ...]) -> str:
+    sb = []
+    for (_, heading), text in zip(SB_BRIEF_HEADINGS, sections):
+        text = (text or "").strip()
+        if text:
+            sb.append(f"{heading}:\n{text}")
+    return "\n\n".join(sb).strip() if sb else "— None provided —"
@@ -0,0 +1,28 @@
+import threading
+
+import pytest
+
+
+def _join_autosave_writer(timeout: float = 10.0) -> None:
+    """Wait out the debounce and any write in flight (the writer thread exits once idle)."""
+    for t in threading.enumerate():
+        if t.name == "olivetti-autosave":
+            t.join(timeout)
+
+
+@pytest.fixture(autouse=True)
+def autosave_dir(tmp_path, monkeypatch):
+    """
+    Run each test in its own directory (autosave/ is relative to the working
+    directory). The writer thread is shared by every session in the process,
+    so it is flushed before the directory is left; otherwise a late write
+    lands in the next test's autosave/.
+    """
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path / "autosave"
+    _join_autosave_writer()
+
+
+@pytest.fixture
+def flush_autosave():
+    return _join_autosave_writer
@@ -0,0 +1,18 @@
+"""A new session must load edits that are still waiting on the debounced autosave writer."""
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+
+
+def test_new_session_sees_edit_still_pending_on_the_writer():
+    first = AppTest.from_file(str(APP), default_timeout=60)
+    first.run()
+    refreshed = AppTest.from_file(str(APP), default_timeout=60)  # e.g. a browser refresh or second tab
+
+    first.text_area(key="synopsis").set_value("An edit made inside the debounce window.").run()
+    refreshed.run()
+
+    assert not refreshed.exception
+    assert refreshed.session_state.synopsis == "An edit made inside the debounce window."
@@ -0,0 +1,55 @@
+"""
+Training samples must survive Streamlit reruns.
+
+Streamlit re-executes app.py on every rerun, so anything stored in
+st.session_state has to be recognised by the *next* run's code, too.
+"""
+import gzip
+import json
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+
+FIRST = "The first sample paragraph arrives here, long enough to keep."
+SECOND = "A second sample paragraph follows in a later run entirely."
+
+
+def _saved_lane(autosave_dir: Path, bank: str, name: str, lane: str) -> list:
+    state = json.loads(gzip.decompress((autosave_dir / "olivetti_state.json.gz").read_bytes()))
+    return state["sb_workspace"][bank][name]["lanes"][lane]["texts"]
+
+
+def test_style_samples_added_across_reruns_are_kept_and_saved(autosave_dir, flush_autosave):
+    at = AppTest.from_file(str(APP), default_timeout=60)
+    at.run()
+
+    for text in (FIRST, SECOND):
+        at.text_area(key="style_train_paste").set_value(text).run()
+        at.button(key="style_train_add").click().run()
+        assert not at.exception
+
+    style = at.session_state.style_train_style
+    lane = at.session_state.style_train_lane
+    assert at.session_state.style_banks[style]["lanes"][lane].texts == [FIRST, SECOND]
+
+    flush_autosave()
+    assert _saved_lane(autosave_dir, "style_banks", style, lane) == [FIRST, SECOND]
+
+
+def test_voice_samples_added_across_reruns_are_kept_and_saved(autosave_dir, flush_autosave):
+    at = AppTest.from_file(str(APP), default_timeout=60)
+    at.run()
+
+    for text in (FIRST, SECOND):
+        at.text_area(key="vault_sample_text").set_value(text).run()
+        at.button(key="vault_add_sample").click().run()
+        assert not at.exception
+
+    voice = at.session_state.vault_voice_sel
+    lane = at.session_state.vault_lane_sel
+    assert at.session_state.voices[voice]["lanes"][lane].texts == [FIRST, SECOND]
+
+    flush_autosave()
+    assert _saved_lane(autosave_dir, "voices", voice, lane) == [FIRST, SECOND]
@@ -0,0 +1,345 @@
+"""
+Hashed-vector machinery for the Voice Vault and style banks.
+
+This lives outside app.py on purpose: Streamlit re-executes the app script on
+every rerun, but an imported module runs once per process. SampleLane keeps
+one class identity (lanes stored in session state by an earlier run still
+pass isinstance checks), and compiled kernels and memo caches survive from one
+rerun to the next.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit  # type: ignore
+    HAS_NUMBA = True
+except Exception:
+    HAS_NUMBA = False
+
+
+# Numeric kernels: compiled with numba when installed, plain NumPy otherwise.
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def _bucket_weights(idx: np.ndarray, dims: int) -> np.ndarray:
+        vec = np.zeros(dims, dtype=np.float32)
+        for i in range(idx.shape[0]):
+            vec[idx[i]] += 1.0
+        for i in range(dims):
+            if vec[i] > 0.0:
+                vec[i] = 1.0 + np.log(vec[i])
+        return vec
+
+    @njit(cache=True, fastmath=True)
+    def _dot_rows_q8(mat: np.ndarray, qv: np.ndarray) -> np.ndarray:
+        out = np.zeros(mat.shape[0], dtype=np.float32)
+        for r in range(mat.shape[0]):
+            acc = 0.0
+            for i in range(qv.shape[0]):
+                acc += qv[i] * mat[r, i]
+            out[r] = acc
+        return out
+else:
+    def _bucket_weights(idx: np.ndarray, dims: int) -> np.ndarray:
+        vec = np.bincount(idx, minlength=dims).astype(np.float32)
+        hit = vec > 0.0
+        vec[hit] = 1.0 + np.log(vec[hit])
+        return vec
+
+    def _dot_rows_q8(mat: np.ndarray, qv: np.ndarray) -> np.ndarray:
+        return mat.astype(np.float32) @ qv
+
+
+WORD_RE = re.compile(r"[A-Za-z']+")
+
+
+def now_ts() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _tokenize(text: str) -> List[str]:
+    # match on the original text: lowercasing first would turn "İ" or the Kelvin
+    # sign into ASCII letters WORD_RE then picks up. The tokens are ASCII and
+    # hold no whitespace, so they are lowercased in one call and split back.
+    return " ".join(WORD_RE.findall(text or "")).lower().split()
+
+
+VEC_DIMS = 512
+
+
+# Token hashing is a polynomial hash over the joined token bytes, done with
+# uint64 prefix sums (wrapping arithmetic) so there's no per-token Python work.
+_HASH_P = np.uint64(0x100000001B3)
+_HASH_P_INV = np.uint64(pow(0x100000001B3, -1, 1 << 64))
+_HASH_MIX = np.uint64(0xFF51AFD7ED558CCD)
+
+
+def _joined_token_hashes(joined: str) -> np.ndarray:
+    """Hashes of the space-separated tokens in `joined`, in order."""
+    if not joined:
+        return np.zeros(0, dtype=np.uint64)
+    buf = np.frombuffer(joined.encode("ascii"), dtype=np.uint8).astype(np.uint64)
+    n = buf.shape[0]
+    with np.errstate(over="ignore"):
+        ppow = np.cumprod(np.full(n, _HASH_P, dtype=np.uint64))  # P^1 .. P^n
+        qpow = np.empty(n, dtype=np.uint64)
+        qpow[0] = 1
+        qpow[1:] = np.cumprod(np.full(n - 1, _HASH_P_INV, dtype=np.uint64))  # P^-i
+        prefix = np.zeros(n + 1, dtype=np.uint64)
+        np.cumsum(buf * qpow, out=prefix[1:])
+        spaces = np.flatnonzero(buf == 32)
+        starts = np.concatenate(([0], spaces + 1))
+        ends = np.concatenate((spaces, [n]))
+        # sum(b_i * P^(end-1-i)) for each token, then a murmur-style finalizer
+        h = (prefix[ends] - prefix[starts]) * np.concatenate(([np.uint64(1)], ppow))[ends - 1]
+        h ^= h >> np.uint64(33)
+        h *= _HASH_MIX
+        h ^= h >> np.uint64(33)
+    return h
+
+
+def _token_hashes(text: str) -> np.ndarray:
+    return _joined_token_hashes(" ".join(_tokenize(text)))
+
+
+def _hash_vec(text: str, dims: int = VEC_DIMS) -> np.ndarray:
+    idx = (_token_hashes(text) % np.uint64(dims)).astype(np.int64)
+    return _bucket_weights(idx, dims)
+
+
+def _hash_vecs(texts: Sequence[str], dims: int = VEC_DIMS) -> np.ndarray:
+    """
+    (N, dims) float32 rows equal to `_hash_vec` of each text, computed in one
+    batch: a token hash depends only on its bytes, so all texts' tokens are
+    hashed as one joined string and binned by (row, bucket) with one bincount.
+    """
+    toks = [_tokenize(t) for t in texts]
+    counts = np.fromiter((len(tk) for tk in toks), dtype=np.int64, count=len(toks))
+    h = _joined_token_hashes(" ".join(" ".join(tk) for tk in toks if tk))
+    idx = (h % np.uint64(dims)).astype(np.int64)
+    idx += np.repeat(np.arange(len(toks), dtype=np.int64) * dims, counts)
+    mat = np.bincount(idx, minlength=len(toks) * dims).astype(np.float32).reshape(len(toks), dims)
+    hit = mat > 0.0
+    mat[hit] = 1.0 + np.log(mat[hit])
+    return mat
+
+
+def _embed_samples(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    L2-normalize each text's hash vector and quantize it to int8 with a
+    per-row scale (v ≈ q * scale). Returns (N, VEC_DIMS) int8 rows and
+    (N,) float32 scales; an empty text gets a zero row and scale 0.
+    """
+    mat = _hash_vecs(texts)
+    norms = np.sqrt(np.einsum("ij,ij->i", mat, mat))
+    nz = norms > 0.0
+    mat[nz] /= norms[nz, None]
+    peaks = np.abs(mat).max(axis=1) if len(mat) else np.zeros(0, dtype=np.float32)
+    mult = np.zeros_like(peaks)
+    np.divide(np.float32(127.0), peaks, out=mult, where=nz)
+    q = np.round(mat * mult[:, None]).astype(np.int8)
+    return q, (peaks / np.float32(127.0)).astype(np.float32)
+
+
+@lru_cache(maxsize=64)
+def _query_vec(text: str) -> np.ndarray:
+    """Unit-length float32 query vector (kept full precision; samples are int8)."""
+    v = _hash_vec(text)
+    norm = float(np.linalg.norm(v))
+    if norm > 0.0:
+        v = v / norm
+    v.flags.writeable = False
+    return v
+
+
+# Hash-consed lane matrices: equal sample lists (the same lane in the
+# workspace and several projects, or a project re-opened after a bay hop)
+# share one read-only (vecs, scales) pair instead of re-embedding it.
+# SampleLane never writes into these arrays; extend/pop replace them.
+@lru_cache(maxsize=256)
+def _lane_matrix(texts: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    vecs, scales = _embed_samples(texts)
+    vecs.flags.writeable = False
+    scales.flags.writeable = False
+    return vecs, scales
+
+
+def _lane_columns(raw: Any, clean=str.strip) -> Tuple[List[str], List[str]]:
+    """
+    (ts, texts) from any stored lane shape: columnar dict, legacy list of
+    dicts/strings, or a SampleLane. Columnar lanes flagged `"n"` were written
+    from cleaned samples, so `clean` is skipped for them.
+    """
+    if isinstance(raw, SampleLane):
+        return list(raw.ts), list(raw.texts)
+    ts_out: List[str] = []
+    texts_out: List[str] = []
+    if isinstance(raw, dict):
+        if raw.get("n"):
+            clean = str
+        texts = raw.get("texts") or []
+        stamps = raw.get("ts") or []
+        pairs = ((stamps[i] if i < len(stamps) else None, t) for i, t in enumerate(texts))
+    elif isinstance(raw, list):
+        pairs = ((None, it) if isinstance(it, str) else (it.get("ts"), it.get("text")) for it in raw if isinstance(it, (str, dict)))
+    else:
+        return ts_out, texts_out
+    for stamp, t in pairs:
+        t = clean(t or "")
+        if t:
+            ts_out.append(stamp or now_ts())
+            texts_out.append(t)
+    return ts_out, texts_out
+
+
+class SampleLane:
+    """One lane of training samples, stored column-wise.
+
+    Parallel `ts`/`texts` lists plus an (N, VEC_DIMS) int8 matrix and per-row
+    scales, so retrieval is one matrix-vector product instead of a dict walk.
+    """
+
+    __slots__ = ("ts", "texts", "vecs", "scales")
+
+    def __init__(self) -> None:
+        self.ts: List[str] = []
+        self.texts: List[str] = []
+        self.vecs = np.zeros((0, VEC_DIMS), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @classmethod
+    def from_compact(cls, raw: Any, clean=str.strip, reuse: Any = None) -> "SampleLane":
+        """
+        Build a lane from stored data. If `reuse` (the lane being replaced)
+        already holds a prefix of the stored samples, it is kept and only the
+        remaining samples are embedded and appended.
+        """
+        if isinstance(raw, SampleLane):
+            return raw
+        ts, texts = _lane_columns(raw, clean)
+        if isinstance(reuse, SampleLane) and reuse.texts == texts[: len(reuse)]:
+            n = len(reuse)
+            reuse.ts = ts[:n]
+            reuse.extend(texts[n:], ts[n:])
+            return reuse
+        lane = cls()
+        if texts:
+            lane.ts, lane.texts = ts, texts
+            lane.vecs, lane.scales = _lane_matrix(tuple(texts))
+        return lane
+
+    def to_compact(self) -> Dict[str, Any]:
+        return {"ts": list(self.ts), "texts": list(self.texts), "n": 1}
+
+    def extend(self, texts: List[str], ts: Optional[List[str]] = None, cap: Optional[int] = None) -> int:
+        """
+        Embed and append a batch of (already cleaned) texts with one stack per
+        column. With `cap`, the lane is bounded to its newest `cap` samples:
+        rows that would be evicted are dropped before stacking (and batch
+        texts that would not survive are never embedded), so the matrix is
+        copied once rather than grown and then trimmed.
+        """
+        added = len(texts)
+        if ts is None:
+            ts = [now_ts()] * added
+        if cap is not None:
+            cap = max(cap, 0)
+            if added > cap:
+                texts, ts = texts[added - cap:], ts[len(ts) - cap:]
+            drop = max(len(self.texts) + len(texts) - cap, 0)
+            if drop:
+                del self.texts[:drop]
+                del self.ts[:drop]
+                self.vecs = self.vecs[drop:]
+                self.scales = self.scales[drop:]
+        if not texts:
+            return added
+        vecs, scales = _embed_samples(texts)
+        self.vecs = np.vstack([self.vecs, vecs])
+        self.scales = np.concatenate([self.scales, scales])
+        self.texts.extend(texts)
+        self.ts.extend(ts)
+        return added
+
+    def pop(self, idx: int = -1) -> None:
+        idx = idx % len(self.texts)
+        self.ts.pop(idx)
+        self.texts.pop(idx)
+        self.vecs = np.delete(self.vecs, idx, axis=0)
+        self.scales = np.delete(self.scales, idx)
+
+    def top_k(self, qv: np.ndarray, k: int, window: int) -> List[Tuple[float, str]]:
+        """
+        Best `k` (score, text) among the newest `window` samples, best first
+        (ties keep insertion order). Rows are unit vectors up to their stored
+        scale, so a score is one int8 row·query product times that scale.
+        """
+        return _top_k_lanes(qv, [(self, k)], window)[0]
+
+    @classmethod
+    def merged(cls, lanes: List["SampleLane"], tail: int) -> "SampleLane":
+        """The newest `tail` samples of the lanes concatenated in order (copies only those rows)."""
+        out = cls()
+        parts: List[Tuple["SampleLane", int]] = []
+        need = tail
+        for ln in reversed(lanes):
+            if need <= 0:
+                break
+            take = min(len(ln), need)
+            if take:
+                parts.append((ln, len(ln) - take))
+                need -= take
+        parts.reverse()
+        if parts:
+            out.ts = [t for ln, s in parts for t in ln.ts[s:]]
+            out.texts = [t for ln, s in parts for t in ln.texts[s:]]
+            out.vecs = np.vstack([ln.vecs[s:] for ln, s in parts])
+            out.scales = np.concatenate([ln.scales[s:] for ln, s in parts])
+        return out
+
+
+def _select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` best scores, best first, ties in index order (argpartition, not a full sort)."""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < scores.shape[0]:
+        top = np.argpartition(-scores, k - 1)[:k]
+        # the k-th score may tie with rows argpartition left out; keep the earliest
+        top = np.flatnonzero(scores >= scores[top].min())
+    else:
+        top = np.arange(scores.shape[0])
+    return top[np.argsort(-scores[top], kind="stable")][:k]
+
+
+def _top_k_lanes(qv: np.ndarray, wanted: List[Tuple[SampleLane, int]], window: int) -> List[List[Tuple[float, str]]]:
+    """
+    Top-k (score, text) for several lanes against one query: the newest
+    `window` rows of every lane are scored in a single kernel call, then
+    split back per lane.
+    """
+    spans = [(pool, k, max(0, len(pool) - window)) for pool, k in wanted]
+    live = [(pool, start) for pool, k, start in spans if k > 0 and start < len(pool)]
+    if not live:
+        return [[] for _ in wanted]
+    if len(live) == 1:
+        pool, start = live[0]
+        scores = _dot_rows_q8(pool.vecs[start:], qv) * pool.scales[start:]
+    else:
+        scores = _dot_rows_q8(np.vstack([p.vecs[s:] for p, s in live]), qv) * np.concatenate([p.scales[s:] for p, s in live])
+    out: List[List[Tuple[float, str]]] = []
+    off = 0
+    for pool, k, start in spans:
+        if k <= 0 or start >= len(pool):
+            out.append([])
+            continue
+        n = len(pool) - start
+        part = scores[off: off + n]
+        off += n
+        out.append([(float(part[i]), pool.texts[start + i]) for i in _select_top_k(part, k)])
+    return out